@@ -0,0 +1,239 @@
+# admission.py
+# Zulassungskontrolle vor den DB-lastigen Handlern: begrenzte Parallelität mit Prioritäten
+# (Schreiben vor Einzel-Lesen vor Massen-Lesen), Limits pro Route, schnelle 503 statt
+# 30 Sekunden am Pool zu warten, plus Rate-Limit pro Nutzer.
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from starlette.requests import Request
+
+from auth import request_identity
+from database import settings as db_settings
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED
+
+load_dotenv()
+
+# Prioritäten (kleiner = wichtiger)
+WRITE = 0
+READ = 1
+BULK = 2
+PRIORITY_NAMES = {WRITE: "write", READ: "read", BULK: "bulk"}
+
+# Ohne DB-Zugriff, werden nie gebremst
+BYPASS_PATHS = {"/status", "/metrics"}
+
+# Große Listen-/Gruppierungsabfragen
+BULK_ROUTES = {("GET", "/notes/"), ("GET", "/notes/grouped"), ("GET", "/crm/")}
+
+# Authentifizierte Requests halten zwei Sessions (get_db + get_current_user)
+_POOL_CAPACITY = db_settings.pool_size + db_settings.max_overflow
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(max(2, _POOL_CAPACITY // 2))))
+# Plätze, die Massen-Lesezugriffe nie belegen dürfen
+ADMISSION_RESERVED = int(os.getenv("ADMISSION_RESERVED", str(max(1, ADMISSION_MAX_CONCURRENCY // 4))))
+ADMISSION_BULK_ROUTE_LIMIT = int(os.getenv("ADMISSION_BULK_ROUTE_LIMIT", str(max(1, ADMISSION_MAX_CONCURRENCY // 4))))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "600"))  # 0 = aus
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "100"))
+
+
+def classify(method: str, path: str) -> Tuple[int, str]:
+    if (method, path) in BULK_ROUTES:
+        return BULK, path
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return READ, path
+    return WRITE, path
+
+
+# =======================
+# 🚦 Prioritäts-Limiter
+# =======================
+class AdmissionController:
+    def __init__(self, max_concurrency: int, reserved: int, route_limits: Dict[str, int],
+                 max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.reserved = min(reserved, max_concurrency - 1)
+        self.route_limits = route_limits
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.route_in_flight = Counter()
+        self.priority_in_flight = Counter()
+        self._waiters = []  # Heap aus [priority, seq, future, route]
+        self._seq = itertools.count()
+
+    def _can_admit(self, priority: int, route: str) -> bool:
+        limit = self.max_concurrency if priority < BULK else self.max_concurrency - self.reserved
+        if self.in_flight >= limit:
+            return False
+        route_limit = self.route_limits.get(route)
+        return route_limit is None or self.route_in_flight[route] < route_limit
+
+    def _grant(self, priority: int, route: str):
+        self.in_flight += 1
+        # Nur begrenzte Routen zählen – sonst bliebe jeder Pfad (/notes/123, /crm/<uuid>) als Schlüssel liegen
+        if route in self.route_limits:
+            self.route_in_flight[route] += 1
+        self.priority_in_flight[priority] += 1
+
+    def _update_gauges(self):
+        waiting = Counter(w[0] for w in self._waiters if not w[2].done())
+        for priority, name in PRIORITY_NAMES.items():
+            ADMISSION_IN_FLIGHT.set(self.priority_in_flight[priority], priority=name)
+            ADMISSION_QUEUE_DEPTH.set(waiting[priority], priority=name)
+
+    async def acquire(self, priority: int, route: str) -> Optional[str]:
+        # Gibt None zurück, wenn zugelassen – sonst den Ablehnungsgrund
+        higher_waiting = any(w[0] < priority and not w[2].done() for w in self._waiters)
+        if not higher_waiting and self._can_admit(priority, route):
+            self._grant(priority, route)
+            self._update_gauges()
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._seq), future, route])
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._drop_cancelled()
+                return "timeout"
+        except asyncio.CancelledError:
+            # Client weg: einen evtl. schon vergebenen Platz zurückgeben
+            if future.done() and not future.cancelled():
+                self.release(priority, route)
+            else:
+                future.cancel()
+                self._drop_cancelled()
+            raise
+        finally:
+            ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - start, priority=PRIORITY_NAMES[priority])
+            self._update_gauges()
+        return None
+
+    def release(self, priority: int, route: str):
+        self.in_flight -= 1
+        if route in self.route_limits:
+            self.route_in_flight[route] -= 1
+        self.priority_in_flight[priority] -= 1
+        self._wake()
+        self._update_gauges()
+
+    def _drop_cancelled(self):
+        self._waiters = [w for w in self._waiters if not w[2].done()]
+        heapq.heapify(self._waiters)
+
+    def _wake(self):
+        # In Prioritätsreihenfolge alle zulassen, die gerade passen
+        granted = False
+        for waiter in sorted(self._waiters):
+            priority, _, future, route = waiter
+            if future.done():
+                continue
+            if self._can_admit(priority, route):
+                self._grant(priority, route)
+                future.set_result(True)
+                granted = True
+        if granted or any(w[2].done() for w in self._waiters):
+            self._drop_cancelled()
+
+
+# =======================
+# 🪣 Rate-Limit pro Nutzer (Token Bucket)
+# =======================
+class RateLimiter:
+    def __init__(self, per_minute: float, burst: float):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self._buckets: Dict[str, list] = {}  # identity -> [tokens, zeitpunkt]
+
+    def allow(self, identity: str) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        bucket = self._buckets.get(identity)
+        if bucket is None:
+            if len(self._buckets) > 10000:
+                self._prune(now)
+            bucket = self._buckets[identity] = [self.burst, now]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def _prune(self, now: float):
+        # Volle Buckets brauchen wir nicht zu merken
+        full_after = self.burst / self.rate
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < full_after}
+
+
+controller = AdmissionController(
+    ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_RESERVED,
+    {route: ADMISSION_BULK_ROUTE_LIMIT for _, route in BULK_ROUTES},
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+)
+rate_limiter = RateLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
+
+
+# =======================
+# ⏱️ ASGI-Middleware
+# =======================
+async def _reject(send, status_code: int, detail: str, retry_after: int):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in BYPASS_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        priority, route = classify(scope["method"], scope["path"])
+        priority_name = PRIORITY_NAMES[priority]
+
+        if not rate_limiter.allow(request_identity(Request(scope))):
+            ADMISSION_REJECTED.inc(reason="rate_limited", priority=priority_name)
+            await _reject(send, 429, "Zu viele Anfragen, bitte kurz warten", ADMISSION_RETRY_AFTER)
+            return
+
+        reason = await controller.acquire(priority, route)
+        if reason is not None:
+            ADMISSION_REJECTED.inc(reason=reason, priority=priority_name)
+            await _reject(send, 503, "Server ausgelastet, bitte später erneut versuchen", ADMISSION_RETRY_AFTER)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(priority, route)
@@ -0,0 +1,136 @@
+# archive.py
+# Hot/Cold-Trennung: erledigte, alte Notizen und CRM-Einträge wandern in Archivtabellen.
+# Gearbeitet wird in kleinen Batches mit je eigener Transaktion, damit die Haupttabellen
+# nie lange gesperrt sind.
+import asyncio
+import datetime
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, exists
+from sqlalchemy.orm import Session, selectinload
+
+from database import SessionLocal
+from metrics import ARCHIVED_ROWS
+import models
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE_SECONDS", "0.2"))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0"))  # 0 = kein Job in der App
+
+# Spalten aus NoteFields/CrmEntryFields (die IDs werden separat übernommen)
+NOTE_FIELDS = [c.name for c in models.ArchivedNote.__table__.columns
+               if c.name in models.Note.__table__.columns and c.name not in ("id", "user_id")]
+CRM_FIELDS = [c.name for c in models.ArchivedCrmEntry.__table__.columns
+              if c.name in models.CrmEntry.__table__.columns and c.name != "id"]
+
+
+def _cutoff(days: int) -> datetime.datetime:
+    return datetime.datetime.utcnow() - datetime.timedelta(days=days)
+
+
+# =======================
+# 📦 Ein Batch
+# =======================
+def archive_notes_batch(db: Session, cutoff: datetime.datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    condition = (
+        models.Note.is_done == True,  # noqa: E712
+        models.Note.created_at < cutoff,
+        # Tracking-Notizen bleiben, solange ihr CRM-Eintrag existiert – include=notes liest nur die Haupttabelle
+        ~exists().where(models.CrmEntry.id == models.Note.crm_entry_id),
+        ~exists().where(models.ArchivedCrmEntry.id == models.Note.crm_entry_id),
+    )
+    # Kandidaten ohne Sperre lesen, danach nur diese Zeilen per Primärschlüssel sperren
+    candidate_ids = [row.id for row in db.query(models.Note.id).filter(*condition)
+                     .order_by(models.Note.id).limit(batch_size)]
+    if not candidate_ids:
+        return 0
+    notes = (
+        db.query(models.Note)
+        .options(selectinload(models.Note.labels))
+        .filter(models.Note.id.in_(candidate_ids), *condition)
+        .with_for_update()
+        .all()
+    )
+    if not notes:
+        db.rollback()
+        return 0
+
+    ids = [n.id for n in notes]
+    db.add_all([
+        models.ArchivedNote(
+            id=n.id,
+            user_id=n.user_id,
+            labels=[label.name for label in n.labels],
+            **{field: getattr(n, field) for field in NOTE_FIELDS},
+        )
+        for n in notes
+    ])
+    db.execute(delete(models.note_label).where(models.note_label.c.note_id.in_(ids)))
+    db.execute(delete(models.Note).where(models.Note.id.in_(ids)).execution_options(synchronize_session=False))
+    db.commit()
+    ARCHIVED_ROWS.inc(len(ids), kind="notes")
+    return len(candidate_ids)
+
+
+def archive_crm_batch(db: Session, cutoff: datetime.datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    condition = (models.CrmEntry.erledigt == True, models.CrmEntry.anfrage_datum < cutoff)  # noqa: E712
+    candidate_ids = [row.id for row in db.query(models.CrmEntry.id).filter(*condition)
+                     .order_by(models.CrmEntry.id).limit(batch_size)]
+    if not candidate_ids:
+        return 0
+    entries = (
+        db.query(models.CrmEntry)
+        .filter(models.CrmEntry.id.in_(candidate_ids), *condition)
+        .with_for_update()
+        .all()
+    )
+    if not entries:
+        db.rollback()
+        return 0
+
+    ids = [e.id for e in entries]
+    db.add_all([
+        models.ArchivedCrmEntry(id=e.id, **{field: getattr(e, field) for field in CRM_FIELDS})
+        for e in entries
+    ])
+    db.execute(delete(models.CrmEntry).where(models.CrmEntry.id.in_(ids)).execution_options(synchronize_session=False))
+    db.commit()
+    ARCHIVED_ROWS.inc(len(ids), kind="crm")
+    return len(candidate_ids)
+
+
+# =======================
+# 🔁 Kompletter Lauf
+# =======================
+def run_archiver(days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                 pause: float = ARCHIVE_BATCH_PAUSE) -> dict:
+    cutoff = _cutoff(days)
+    totals = {"notes": 0, "crm": 0}
+    for kind, archive_batch in (("notes", archive_notes_batch), ("crm", archive_crm_batch)):
+        while True:
+            with SessionLocal() as db:
+                moved = archive_batch(db, cutoff, batch_size)
+            totals[kind] += moved
+            if moved < batch_size:
+                break
+            # Anderen Schreibern zwischen den Batches Luft lassen
+            time.sleep(pause)
+    logger.info("Archivierung abgeschlossen: %s", totals, extra=totals)
+    return totals
+
+
+async def archive_loop(interval: int = ARCHIVE_INTERVAL_SECONDS):
+    while True:
+        try:
+            await asyncio.to_thread(run_archiver)
+        except Exception:
+            logger.exception("Archivierung fehlgeschlagen")
+        await asyncio.sleep(interval)
@@ -1,9 +1,8 @@
+import functools
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from database import SessionLocal
 from models import User
@@ -19,7 +18,13 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # Zeit die nach der man sich wieder anmelden
 
 # FastAPI OAuth2-Scheme für REST-Endpunkte
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# jose/passlib erst bei Bedarf laden – hält den Import von main (Worker-Kaltstart) klein
+@functools.lru_cache(maxsize=None)
+def _pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 # 📦 Datenbank-Session
@@ -33,10 +38,10 @@ def get_db():
 
 # 🔐 Passwort-Funktionen
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 
 # 🔍 Nutzer aus DB
@@ -57,6 +62,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
+    from jose import jwt
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -70,12 +76,9 @@ def get_current_user(
         detail="Token ungültig oder abgelaufen",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if not username:
-            raise credentials_exception
-    except JWTError:
+    payload = decode_token(token)
+    username: str = payload.get("sub") if payload else None
+    if not username:
         raise credentials_exception
 
     user = get_user_by_username(db, username)
@@ -86,8 +89,19 @@ def get_current_user(
 
 # ✅ Token-Decoder für WebSocket & andere manuelle Prüfungen
 def decode_token(token: str) -> Optional[dict]:
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
         return None
+
+
+# 🪪 Wer stellt den Request? (für Read-your-writes ohne DB-Zugriff)
+def request_identity(request: Request) -> str:
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        payload = decode_token(authorization[7:])
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    return f"ip:{request.client.host if request.client else ''}"
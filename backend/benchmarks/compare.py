@@ -0,0 +1,40 @@
+# benchmarks/compare.py
+# Vergleicht zwei Lasttest-Ergebnisse (JSON), z.B. vor und nach einem Commit.
+#
+#   python -m benchmarks.compare benchmarks/results/alt.json benchmarks/results/neu.json
+import argparse
+import json
+
+METRICS = ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "errors"]
+
+
+def _delta(old, new) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(old: dict, new: dict):
+    print(f"{old['meta']['commit']} → {new['meta']['commit']}")
+    for name in sorted(set(old["endpoints"]) | set(new["endpoints"])):
+        before = old["endpoints"].get(name)
+        after = new["endpoints"].get(name)
+        if not before or not after:
+            print(f"{name}: nur in einem Lauf vorhanden")
+            continue
+        print(name)
+        for metric in METRICS:
+            print(f"  {metric:>15}: {before[metric]:>10} → {after[metric]:>10}  ({_delta(before[metric], after[metric])})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark-Ergebnisse vergleichen")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+    with open(args.old) as f_old, open(args.new) as f_new:
+        compare(json.load(f_old), json.load(f_new))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# benchmarks/load_test.py
+# Lastsimulation gegen die FastAPI-App: viele parallele REST-Clients + WebSocket-Listener,
+# Ergebnis (Durchsatz, p50/p95/p99 je Endpunkt) als JSON.
+#
+#   cd backend
+#   pip install -r benchmarks/requirements.txt
+#   export DATABASE_URL=sqlite:///benchmarks/bench.sqlite3
+#   python -m benchmarks.seed --notes 100000 --crm 200000
+#   python -m benchmarks.load_test --concurrency 32 --requests 500 --listeners 50
+#
+# Ohne --url wird die App in diesem Prozess unter uvicorn gestartet.
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import threading
+import time
+
+import httpx
+import websockets
+
+from benchmarks.seed import BENCH_PASSWORD, BENCH_USER
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+ENDPOINTS = ["login", "notes", "notes_grouped", "crm", "create_note"]
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors: int, wall_seconds: float, extra: dict = None) -> dict:
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3)
+    data = {
+        "requests": len(values) + errors,
+        "errors": errors,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+    if extra:
+        data.update(extra)
+    return data
+
+
+# =======================
+# 🚀 App im Prozess starten
+# =======================
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_inprocess_server():
+    # Alle Requests kommen vom selben Bench-Nutzer – Rate-Limit würde die Messung verfälschen
+    os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "0")
+    import uvicorn
+    from main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server, thread
+
+
+# =======================
+# 🔄 WebSocket-Listener
+# =======================
+class Listeners:
+    def __init__(self, ws_url: str, count: int):
+        self.ws_url = ws_url
+        self.count = count
+        self.received = {}  # note_id -> [Empfangszeitpunkte]
+        self.connected = 0
+        self._tasks = []
+        self._ready = asyncio.Event()
+
+    async def _listen(self):
+        async with websockets.connect(self.ws_url, max_size=None) as ws:
+            self.connected += 1
+            if self.connected == self.count:
+                self._ready.set()
+            async for message in ws:
+                data = json.loads(message)
+                if data.get("event") == "note_created":
+                    self.received.setdefault(data.get("id"), []).append(time.perf_counter())
+
+    async def start(self):
+        if not self.count:
+            return
+        self._tasks = [asyncio.create_task(self._listen()) for _ in range(self.count)]
+        await asyncio.wait_for(self._ready.wait(), timeout=30)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# =======================
+# 📈 Szenarien
+# =======================
+async def run_scenario(total: int, concurrency: int, make_request):
+    latencies, errors, shed = [], 0, 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors, shed
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await make_request()
+                if response.status_code in (429, 503):
+                    # Von der Zulassungskontrolle abgewiesen
+                    shed += 1
+                    errors += 1
+                    continue
+                if response.status_code >= 400:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, shed, time.perf_counter() - started
+
+
+async def run(args, base_url: str) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        login = {"username": BENCH_USER, "password": BENCH_PASSWORD}
+        response = await client.post("/token", data=login)
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        ws_url = base_url.replace("http", "ws", 1) + f"/ws/notes?token={token}"
+        listeners = Listeners(ws_url, args.listeners)
+        await listeners.start()
+
+        created = {}
+
+        async def create_note():
+            sent = time.perf_counter()
+            response = await client.post("/notes/", headers=headers, json={
+                "first_name": "Bench", "last_name": "Mark", "note_text": "Lasttest",
+                "gender": "d", "labels": ["Kit"],
+            })
+            if response.status_code == 201:
+                created[response.json()["id"]] = sent
+            return response
+
+        scenarios = {
+            "login": lambda: client.post("/token", data=login),
+            "notes": lambda: client.get("/notes/", headers=headers),
+            "notes_grouped": lambda: client.get("/notes/grouped", headers=headers),
+            "crm": lambda: client.get("/crm/", headers=headers),
+            "create_note": create_note,
+        }
+        for name in args.endpoints:
+            total = args.heavy_requests if name == "notes_grouped" else args.requests
+            print(f"▶ {name}: {total} Requests, {args.concurrency} parallel", flush=True)
+            latencies, errors, shed, wall = await run_scenario(total, args.concurrency, scenarios[name])
+            extra = {"shed": shed}
+            if name == "create_note" and args.listeners:
+                # Zeit vom Absenden des POST bis zum Eintreffen beim Listener
+                await asyncio.sleep(1)
+                delivery = sorted(
+                    recv - created[note_id]
+                    for note_id, times in listeners.received.items() if note_id in created
+                    for recv in times
+                )
+                extra["broadcast"] = {
+                    "listeners": args.listeners,
+                    "deliveries": len(delivery),
+                    "expected_deliveries": len(created) * args.listeners,
+                    "p50_ms": round(percentile(delivery, 50) * 1000, 3),
+                    "p95_ms": round(percentile(delivery, 95) * 1000, 3),
+                    "p99_ms": round(percentile(delivery, 99) * 1000, 3),
+                }
+            results[name] = summarize(latencies, errors, wall, extra)
+            print(f"  {results[name]}", flush=True)
+
+        await listeners.stop()
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest für das Backend")
+    parser.add_argument("--url", help="Laufender Server (sonst uvicorn im Prozess)")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500, help="Requests je Endpunkt")
+    parser.add_argument("--heavy-requests", type=int, default=20, help="Requests für /notes/grouped")
+    parser.add_argument("--listeners", type=int, default=50, help="WebSocket-Listener auf /ws/notes")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="JSON-Datei (Standard: benchmarks/results/<zeit>_<commit>.json)")
+    args = parser.parse_args()
+    # httpx loggt sonst jeden Request auf INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        base_url, server, thread = start_inprocess_server()
+    try:
+        endpoints = asyncio.run(run(args, base_url))
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": (os.getenv("DATABASE_URL") or "mysql").split("://")[0],
+            "mode": "remote" if args.url else "in-process uvicorn",
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "heavy_requests": args.heavy_requests,
+            "listeners": args.listeners,
+        },
+        "endpoints": endpoints,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{commit}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Ergebnis: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# benchmarks/seed.py
+# Befüllt eine lokale Datenbank mit realistischen Mengen an Notizen, Labels und CRM-Einträgen.
+#
+#   cd backend
+#   DATABASE_URL=sqlite:///benchmarks/bench.sqlite3 python -m benchmarks.seed --notes 100000 --crm 200000
+#
+# Achtung: leert alle CRM-Tabellen der Ziel-DB. Läuft nur mit explizit gesetztem DATABASE_URL
+# auf SQLite, localhost oder einer DB mit "bench"/"test" im Namen – sonst nur mit --i-know.
+import argparse
+import datetime
+import os
+import random
+import time
+import uuid
+
+from sqlalchemy import delete, insert
+from sqlalchemy.engine import make_url
+
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench-password"
+
+FIRST_NAMES = ["Anna", "Lena", "Maria", "Sophie", "Julia", "Lukas", "Jonas", "Paul", "Felix", "Max",
+               "Laura", "Sarah", "Tim", "Jan", "Eva", "Hannah", "Leon", "Noah", "Emma", "Mia"]
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker",
+              "Schulz", "Hoffmann", "Koch", "Richter", "Klein", "Wolf", "Neumann", "Schwarz"]
+LABELS = ["Kit", "Abholung", "Rückruf", "Brustkrebs", "Darmkrebs", "Beratung", "Versand", "Labor",
+          "Dringend", "Info", "Rechnung", "Termin", "Website", "Ads", "Befund", "Nachfrage"]
+STATUSES = ["Neu", "In Bearbeitung", "Wartet", "Abgeschlossen", "Auto Email"]
+STADIEN = ["Erstkontakt", "Angebot", "Kit versendet", "Probe erhalten", "Befund"]
+QUELLEN = ["Website DE", "Website EN", "Ads", "Telefon", ""]
+
+
+def _person(rng: random.Random, persons: int):
+    # Begrenzter Personenpool → Notizen teilen sich E-Mail/Telefon/Name wie in echt
+    pid = rng.randrange(persons)
+    first = FIRST_NAMES[pid % len(FIRST_NAMES)]
+    last = LAST_NAMES[(pid // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    return pid, first, last, f"person{pid}@example.org", f"0151{pid:07d}"
+
+
+def _chunks(total: int, size: int):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+def check_target(allow_any: bool = False) -> str:
+    # Ohne DATABASE_URL würde settings auf DB_* aus .env zurückfallen – das ist die Produktions-DB
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL muss explizit gesetzt sein (z.B. sqlite:///benchmarks/bench.sqlite3)")
+    parsed = make_url(url)
+    name = (parsed.database or "").lower()
+    if allow_any or parsed.get_backend_name() == "sqlite" or parsed.host in LOCAL_HOSTS \
+            or "bench" in name or "test" in name:
+        return url
+    raise RuntimeError(f"{parsed.render_as_string(hide_password=True)} sieht nicht nach einer "
+                       "Benchmark-Datenbank aus – alle Daten würden gelöscht. Mit --i-know erzwingen.")
+
+
+def seed(notes: int, crm: int, labels_per_note: int = 2, chunk_size: int = 5000, seed_value: int = 42,
+         allow_any: bool = False):
+    check_target(allow_any)
+    from database import SessionLocal, get_engine
+    import auth
+    import migrations
+    import models
+
+    rng = random.Random(seed_value)
+    migrations.upgrade(get_engine())
+    now = datetime.datetime.utcnow()
+    persons = max(1, notes // 4)
+
+    with SessionLocal() as db:
+        # Vorherige Benchmark-Daten entfernen, damit Läufe vergleichbar bleiben
+        for table in (models.note_label, models.Note.__table__, models.ArchivedNote.__table__,
+                      models.Label.__table__, models.CrmEntry.__table__, models.ArchivedCrmEntry.__table__,
+                      models.OutboxEvent.__table__, models.User.__table__):
+            db.execute(delete(table))
+        db.commit()
+
+        user = models.User(username=BENCH_USER, hashed_password=auth.get_password_hash(BENCH_PASSWORD))
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+        db.execute(insert(models.Label), [{"id": i + 1, "name": name} for i, name in enumerate(LABELS)])
+        db.commit()
+
+        started = time.perf_counter()
+        crm_ids = []
+        for start, size in _chunks(crm, chunk_size):
+            rows = []
+            for _ in range(size):
+                pid, first, last, mail, phone = _person(rng, persons)
+                entry_id = str(uuid.uuid4())
+                crm_ids.append(entry_id)
+                rows.append({
+                    "id": entry_id,
+                    "anfrage_datum": now - datetime.timedelta(minutes=rng.randrange(3 * 365 * 24 * 60)),
+                    "titel": rng.choice(["Frau", "Herr", ""]),
+                    "vorname": first,
+                    "nachname": last,
+                    "email": mail,
+                    "mobil": phone,
+                    "festnetz": "",
+                    "krankheitsstatus": rng.choice(["", "Erstdiagnose", "Nachsorge"]),
+                    "todos": [{"text": "Rückruf", "done": rng.random() < 0.5}],
+                    "status": rng.choice(STATUSES),
+                    "bearbeiter": rng.choice(["", "JP", "AK", "MS"]),
+                    "stadium": rng.choice(STADIEN),
+                    "kontaktquelle": rng.choice(QUELLEN),
+                    "erledigt": rng.random() < 0.7,
+                    "infos": "Brustkrebs",
+                    "nachricht": "Bitte um Rückruf bezüglich eines Testkits. " * 3,
+                    "strasse": "Musterstraße",
+                    "hausnummer": str(rng.randrange(1, 200)),
+                    "plz": f"{rng.randrange(10000, 99999)}",
+                    "ort": "Berlin",
+                    "land": "Deutschland",
+                })
+            db.execute(insert(models.CrmEntry), rows)
+            db.commit()
+        crm_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for start, size in _chunks(notes, chunk_size):
+            rows, links = [], []
+            for offset in range(size):
+                note_id = start + offset + 1
+                pid, first, last, mail, phone = _person(rng, persons)
+                rows.append({
+                    "id": note_id,
+                    "first_name": first,
+                    "last_name": last,
+                    "email": mail if rng.random() < 0.8 else None,
+                    "telephone": phone if rng.random() < 0.6 else None,
+                    "address": f"Musterstraße {pid % 200}, Berlin",
+                    "note_text": "Kunde hat angerufen und um Informationen gebeten. " * 2,
+                    "custom_date": (now - datetime.timedelta(days=rng.randrange(1000))).date(),
+                    "gender": rng.choice(["w", "m", "d"]),
+                    "is_done": rng.random() < 0.7,
+                    "created_at": now - datetime.timedelta(minutes=rng.randrange(3 * 365 * 24 * 60)),
+                    "user_id": user_id,
+                    "crm_entry_id": rng.choice(crm_ids) if crm_ids and rng.random() < 0.3 else None,
+                    "tracking_type": rng.choice(["Kit", "Abholung", None]),
+                })
+                for label_id in rng.sample(range(1, len(LABELS) + 1), labels_per_note):
+                    links.append({"note_id": note_id, "label_id": label_id})
+            db.execute(insert(models.Note), rows)
+            if links:
+                db.execute(insert(models.note_label), links)
+            db.commit()
+        notes_seconds = time.perf_counter() - started
+
+    return {
+        "notes": notes,
+        "crm_entries": crm,
+        "labels_per_note": labels_per_note,
+        "seed": seed_value,
+        "seed_seconds": {"notes": round(notes_seconds, 2), "crm": round(crm_seconds, 2)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark-Datenbank befüllen")
+    parser.add_argument("--notes", type=int, default=100_000)
+    parser.add_argument("--crm", type=int, default=200_000)
+    parser.add_argument("--labels-per-note", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--i-know", action="store_true", dest="allow_any",
+                        help="Auch auf DBs laufen, die nicht nach Benchmark aussehen (löscht alle Daten!)")
+    args = parser.parse_args()
+    try:
+        check_target(args.allow_any)
+    except RuntimeError as exc:
+        parser.error(str(exc))
+    print(seed(args.notes, args.crm, args.labels_per_note, seed_value=args.seed, allow_any=args.allow_any))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# benchmarks/startup.py
+# Kaltstart eines Workers: jeder Lauf in einem frischen Python-Prozess.
+#   phases  – Import von main, Lifespan-Start (Engine, Outbox, Realtime), erster Request
+#   uvicorn – vom Prozessstart bis zur ersten 200-Antwort auf /status
+#
+#   cd backend
+#   python migrate.py                        # Schema einmalig anlegen
+#   python -m benchmarks.startup --runs 10 --target-ms 300
+#   python -m benchmarks.startup --importtime   # teuerste Importe anzeigen
+import argparse
+import datetime
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.load_test import RESULTS_DIR, _git_commit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Läuft im Kindprozess; misst ohne Testclient/httpx, damit deren Importe nicht mitzählen
+_PHASES_SCRIPT = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+
+async def _get(app, path):
+    sent = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        sent.append(message)
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+             "root_path": "", "headers": [], "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80)}
+    await app(scope, receive, send)
+    return sent[0]["status"]
+
+async def _boot():
+    async with main.app.router.lifespan_context(main.app):
+        t2 = time.perf_counter()
+        status = await _get(main.app, "/status")
+        t3 = time.perf_counter()
+        print(json.dumps({"import_ms": (t1 - t0) * 1000, "startup_ms": (t2 - t1) * 1000,
+                          "first_request_ms": (t3 - t2) * 1000, "status": status}), flush=True)
+
+asyncio.run(_boot())
+"""
+
+
+def _summary(values) -> dict:
+    values = sorted(values)
+    return {
+        "median": round(statistics.median(values), 1),
+        "p95": round(values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))], 1),
+        "min": round(values[0], 1),
+        "max": round(values[-1], 1),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_phases(runs: int) -> dict:
+    samples = {"import_ms": [], "startup_ms": [], "first_request_ms": [], "ready_ms": []}
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-c", _PHASES_SCRIPT], cwd=BACKEND_DIR,
+                                stdout=subprocess.PIPE, text=True)
+        line = proc.stdout.readline()
+        # Gesamtzeit inkl. Interpreter-Start, bis der erste Request beantwortet ist
+        ready_ms = (time.perf_counter() - start) * 1000
+        proc.wait()
+        if not line:
+            raise RuntimeError("Startmessung fehlgeschlagen (Ausgabe des Kindprozesses prüfen)")
+        data = json.loads(line)
+        if data["status"] != 200:
+            raise RuntimeError(f"/status antwortete mit {data['status']}")
+        for key in ("import_ms", "startup_ms", "first_request_ms"):
+            samples[key].append(data[key])
+        samples["ready_ms"].append(ready_ms)
+    return {key: _summary(values) for key, values in samples.items()}
+
+
+def measure_uvicorn(runs: int, timeout: float = 30.0) -> dict:
+    samples = []
+    for _ in range(runs):
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}/status"
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR)
+        try:
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"uvicorn beendet mit Code {proc.returncode}")
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError("uvicorn nicht rechtzeitig bereit")
+                try:
+                    with urllib.request.urlopen(url, timeout=1) as response:
+                        if response.status == 200:
+                            break
+                except OSError:
+                    time.sleep(0.005)
+            samples.append((time.perf_counter() - start) * 1000)
+        finally:
+            proc.terminate()
+            proc.wait()
+    return {"ready_ms": _summary(samples)}
+
+
+def slowest_imports(top: int = 15) -> list:
+    # -X importtime: kumulierte Zeiten der direkt von main geladenen Module
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                          cwd=BACKEND_DIR, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        indent = len(line.rsplit("|", 1)[1]) - len(line.rsplit("|", 1)[1].lstrip())
+        if indent <= 3:
+            rows.append({"module": name, "cumulative_ms": round(int(cumulative) / 1000, 1)})
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startzeit-Benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=300.0, help="Ziel für Prozessstart bis bereit (Median)")
+    parser.add_argument("--skip-uvicorn", action="store_true")
+    parser.add_argument("--importtime", action="store_true", help="Teuerste Importe ausgeben")
+    parser.add_argument("--output", help="JSON-Datei (Standard: benchmarks/results/<zeit>_<commit>_startup.json)")
+    args = parser.parse_args()
+
+    results = {"phases": measure_phases(args.runs)}
+    if not args.skip_uvicorn:
+        results["uvicorn"] = measure_uvicorn(args.runs)
+    if args.importtime:
+        results["imports"] = slowest_imports()
+
+    for name in ("phases", "uvicorn"):
+        for key, values in results.get(name, {}).items():
+            print(f"{name:>8} {key:>17}: Median {values['median']:>7} ms  p95 {values['p95']:>7} ms")
+    for row in results.get("imports", []):
+        print(f"  {row['cumulative_ms']:>7} ms  {row['module']}")
+
+    ready = results.get("uvicorn", results["phases"])["ready_ms"]["median"]
+    passed = ready <= args.target_ms
+    print(f"{'✅' if passed else '❌'} Kaltstart {ready} ms (Ziel {args.target_ms:.0f} ms)")
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": (os.getenv("DATABASE_URL") or "mysql").split("://")[0],
+            "runs": args.runs,
+            "target_ms": args.target_ms,
+            "passed": passed,
+        },
+        "startup": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{commit}_startup.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Ergebnis: {output}")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
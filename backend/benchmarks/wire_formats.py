@@ -0,0 +1,144 @@
+# benchmarks/wire_formats.py
+# Bytes auf der Leitung und Kodierzeit je Antwortformat (json/columnar/msgpack)
+# und Kompression (keine/gzip/br) für die großen Listen und WebSocket-Nachrichten.
+#
+#   cd backend
+#   export DATABASE_URL=sqlite:///benchmarks/bench.sqlite3
+#   python -m benchmarks.seed --notes 100000 --crm 200000
+#   python -m benchmarks.wire_formats --repeat 5
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import time
+
+from benchmarks.load_test import RESULTS_DIR, _git_commit
+
+
+def _timed(fn, repeat: int):
+    durations, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    return result, round(statistics.median(durations) * 1000, 3)
+
+
+def _measure(rows, model, repeat: int, groups=None) -> dict:
+    import wire
+
+    fields = list(model.model_fields)
+    dumped, dump_ms = _timed(lambda: wire.dump_rows(rows, model), repeat)
+
+    def columnar():
+        payload = wire.to_columnar(dumped, fields)
+        if groups is not None:
+            payload["groups"] = groups
+        return payload
+
+    encoders = {
+        # wie Starlettes JSONResponse
+        "json": lambda: json.dumps(dumped, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        "columnar": lambda: json.dumps(columnar(), ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+    }
+    if wire.msgpack is not None:
+        encoders["msgpack"] = lambda: wire.msgpack.packb(columnar(), use_bin_type=True)
+    compressions = ["gzip"] + (["br"] if wire.brotli is not None else [])
+
+    result = {"rows": len(rows), "schema_dump_ms": dump_ms, "formats": {}}
+    for name, encoder in encoders.items():
+        body, encode_ms = _timed(encoder, repeat)
+        entry = {"bytes": len(body), "encode_ms": encode_ms}
+        for encoding in compressions:
+            compressed, compress_ms = _timed(lambda: wire.compress(body, encoding), repeat)
+            entry[encoding] = {"bytes": len(compressed), "compress_ms": compress_ms}
+        result["formats"][name] = entry
+    return result
+
+
+def _measure_websocket(repeat: int) -> dict:
+    import wire
+
+    message = {"event": "note_updated", "id": 123456, "seq": 987654, "topic": "notes"}
+    result = {}
+    for encoding in [wire.JSON] + ([wire.MSGPACK] if wire.msgpack is not None else []):
+        payload, _ = _timed(lambda: wire.encode_message(message, encoding), 1)
+        # 1000 Nachrichten in ms = eine Nachricht in µs
+        _, encode_ms = _timed(lambda: [wire.encode_message(message, encoding) for _ in range(1000)], repeat)
+        result[encoding] = {"bytes": len(payload), "encode_us": round(encode_ms, 3)}
+    return result
+
+
+def run(repeat: int, crm_limit: int) -> dict:
+    import crud, grouping, schemas
+    from database import SessionLocal
+    from models import Note
+
+    results = {}
+    with SessionLocal() as db:
+        notes = crud.get_all_notes(db)
+        results["notes"] = _measure(notes, schemas.NoteOut, repeat)
+
+        grouped = grouping.group_notes(db.query(Note).all())
+        flat = [note for group in grouped for note in group]
+        results["notes_grouped"] = _measure(flat, schemas.NoteOut, repeat, groups=[len(g) for g in grouped])
+
+        entries = crud.get_all_crm_entries(db)
+        results["crm"] = _measure(entries, schemas.CrmEntryOut, repeat)
+
+        with_notes = crud.get_all_crm_entries(db, limit=crm_limit, include_notes=True)
+        results["crm_with_notes"] = _measure(with_notes, schemas.CrmEntryWithNotes, repeat)
+    results["websocket_message"] = _measure_websocket(repeat)
+    return results
+
+
+def _print(results: dict):
+    for name, data in results.items():
+        if name == "websocket_message":
+            print(f"{name}: " + ", ".join(f"{enc} {v['bytes']} B / {v['encode_us']} µs" for enc, v in data.items()))
+            continue
+        print(f"{name} ({data['rows']} Zeilen, Schema {data['schema_dump_ms']} ms)")
+        for fmt, entry in data["formats"].items():
+            compressed = "  ".join(
+                f"{enc} {entry[enc]['bytes']:>9} B {entry[enc]['compress_ms']:>8} ms"
+                for enc in ("gzip", "br") if enc in entry
+            )
+            print(f"  {fmt:>9}: {entry['bytes']:>9} B {entry['encode_ms']:>8} ms  {compressed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wire-Format-Benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--crm-limit", type=int, default=500, help="Einträge für ?include=notes")
+    parser.add_argument("--output", help="JSON-Datei (Standard: benchmarks/results/<zeit>_<commit>_wire.json)")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.crm_limit)
+    _print(results)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": (os.getenv("DATABASE_URL") or "mysql").split("://")[0],
+            "repeat": args.repeat,
+        },
+        "wire": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{commit}_wire.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Ergebnis: {output}")
+
+
+if __name__ == "__main__":
+    main()
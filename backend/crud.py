@@ -1,18 +1,30 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import desc, literal, select, union_all
 from fastapi import HTTPException
 import models
 import schemas
 from models import CrmEntry
 from schemas import CrmEntryCreate, CrmEntryUpdate
+from outbox import enqueue
 import uuid
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
 
 # ============================
 # 📋 Alle Notizen
 # ============================
 
-def get_all_notes(db: Session):
-    return db.query(models.Note).order_by(desc(models.Note.created_at)).all()
+def get_all_notes(db: Session, include_archived: bool = False):
+    notes = db.query(models.Note).order_by(desc(models.Note.created_at)).all()
+    if include_archived:
+        notes += get_archived_notes(db)
+        notes.sort(key=lambda n: n.created_at or datetime.min, reverse=True)
+    return notes
+
+def get_archived_notes(db: Session):
+    return db.query(models.ArchivedNote).order_by(desc(models.ArchivedNote.created_at)).all()
 
 def get_notes_for_user(db: Session, user_id: int):
     return (
@@ -31,8 +43,7 @@ def create_label_if_not_exists(db: Session, name: str):
     if not label:
         label = models.Label(name=name)
         db.add(label)
-        db.commit()
-        db.refresh(label)
+        db.flush()  # Commit erfolgt zusammen mit der Notiz
     return label
 
 # ============================
@@ -54,13 +65,13 @@ def create_note(db: Session, note_in: schemas.NoteCreate, user_id: int):
         tracking_type=note_in.tracking_type,
     )
     db.add(db_note)
-    db.commit()
-    db.refresh(db_note)
 
     for name in note_in.labels:
         label = create_label_if_not_exists(db, name)
         db_note.labels.append(label)
 
+    db.flush()  # ID für das Outbox-Event
+    enqueue(db, "notes", "note_created", db_note.id)
     db.commit()
     db.refresh(db_note)
     return db_note
@@ -71,11 +82,13 @@ def create_note(db: Session, note_in: schemas.NoteCreate, user_id: int):
 
 def update_note(db: Session, note_id: int, note_in: schemas.NoteUpdate):
     db_note = db.query(models.Note).filter(models.Note.id == note_id).first()
+    if not db_note:
+        db_note = _restore_note(db, note_id)
     if not db_note:
         return None
 
     update_data = note_in.dict(exclude_unset=True)
-    print('Update Note:', update_data)  # Logging für Debug
+    logger.debug("Update Note %s: %s", note_id, update_data)
 
     for attr, val in update_data.items():
         if attr != "labels":
@@ -94,6 +107,7 @@ def update_note(db: Session, note_id: int, note_in: schemas.NoteUpdate):
             label = create_label_if_not_exists(db, name)
             db_note.labels.append(label)
 
+    enqueue(db, "notes", "note_updated", db_note.id)
     db.commit()
     db.refresh(db_note)
     return db_note
@@ -103,10 +117,12 @@ def update_note(db: Session, note_id: int, note_in: schemas.NoteUpdate):
 # ============================
 
 def delete_note(db: Session, note_id: int):
-    db_note = db.query(models.Note).filter(models.Note.id == note_id).first()
+    db_note = (db.query(models.Note).filter(models.Note.id == note_id).first()
+               or db.query(models.ArchivedNote).filter(models.ArchivedNote.id == note_id).first())
     if not db_note:
         return False
     db.delete(db_note)
+    enqueue(db, "notes", "note_deleted", note_id)
     db.commit()
     return True
 
@@ -115,10 +131,88 @@ def delete_note(db: Session, note_id: int):
 # ============================
 
 def get_note_by_id(db: Session, note_id: int):
-    return db.query(models.Note).filter(models.Note.id == note_id).first()
+    # Archivierte Notizen (aus include_archived) bleiben per ID erreichbar
+    return (db.query(models.Note).filter(models.Note.id == note_id).first()
+            or db.query(models.ArchivedNote).filter(models.ArchivedNote.id == note_id).first())
+
+def _restore_note(db: Session, note_id: int):
+    # Bearbeiten einer archivierten Notiz holt sie zurück in die aktive Tabelle
+    archived = db.query(models.ArchivedNote).filter(models.ArchivedNote.id == note_id).with_for_update().first()
+    if not archived:
+        return None
+    fields = [c.name for c in models.ArchivedNote.__table__.columns
+              if c.name in models.Note.__table__.columns and c.name != "id"]
+    db_note = models.Note(id=archived.id, **{field: getattr(archived, field) for field in fields})
+    for name in archived.labels or []:
+        db_note.labels.append(create_label_if_not_exists(db, name))
+    db.delete(archived)
+    db.add(db_note)
+    return db_note
+
+def get_all_crm_entries(db: Session, skip: int = 0, limit: int = None, include_notes: bool = False,
+                        include_archived: bool = False):
+    if not include_archived:
+        return _crm_page(db, CrmEntry, skip, limit, include_notes)
+    if not (skip or limit is not None):
+        return (_crm_query(db, CrmEntry, include_notes).all()
+                + _crm_query(db, models.ArchivedCrmEntry, include_notes).all())
+    return _crm_page_with_archive(db, skip, limit, include_notes)
+
+def _crm_query(db: Session, model, include_notes: bool):
+    query = db.query(model)
+    if include_notes:
+        # Notizen (inkl. Labels) der ganzen Seite per IN-Abfrage nachladen statt N+1
+        query = query.options(selectinload(model.notes).selectinload(models.Note.labels))
+    return query
 
-def get_all_crm_entries(db: Session):
-    return db.query(CrmEntry).all()
+def _crm_page(db: Session, model, skip: int, limit: int, include_notes: bool):
+    query = _crm_query(db, model, include_notes)
+    if skip or limit is not None:
+        # Stabile Reihenfolge fürs Blättern
+        query = query.order_by(desc(model.anfrage_datum), model.id).offset(skip).limit(limit)
+    return query.all()
+
+def _crm_page_with_archive(db: Session, skip: int, limit: int, include_notes: bool):
+    # Seite über UNION ALL aus aktiven und archivierten Einträgen bestimmen (gleiche Sortierung),
+    # danach nur die Zeilen dieser Seite laden
+    archived_model = models.ArchivedCrmEntry
+    merged = union_all(
+        select(CrmEntry.id, CrmEntry.anfrage_datum, literal(0).label("archived")),
+        select(archived_model.id, archived_model.anfrage_datum, literal(1).label("archived")),
+    ).subquery()
+    page = db.execute(
+        select(merged.c.id, merged.c.archived)
+        .order_by(desc(merged.c.anfrage_datum), merged.c.id)
+        .offset(skip).limit(limit)
+    ).all()
+
+    loaded = {}
+    for archived, model in ((0, CrmEntry), (1, archived_model)):
+        ids = [row.id for row in page if row.archived == archived]
+        if ids:
+            for entry in _crm_query(db, model, include_notes).filter(model.id.in_(ids)):
+                loaded[(entry.id, archived)] = entry
+    return [loaded[(row.id, row.archived)] for row in page if (row.id, row.archived) in loaded]
+
+def get_crm_entry_by_id(db: Session, entry_id: str, include_notes: bool = False):
+    # Archivierte Einträge bleiben per ID erreichbar (Liste mit include_archived, Tracking-Icons)
+    for model in (CrmEntry, models.ArchivedCrmEntry):
+        entry = _crm_query(db, model, include_notes).filter(model.id == entry_id).first()
+        if entry is not None:
+            return entry
+    return None
+
+def _restore_crm_entry(db: Session, entry_id: str):
+    # Bearbeiten eines archivierten Eintrags holt ihn zurück in die aktive Tabelle
+    archived = db.query(models.ArchivedCrmEntry).filter(models.ArchivedCrmEntry.id == entry_id).with_for_update().first()
+    if not archived:
+        return None
+    fields = [c.name for c in models.ArchivedCrmEntry.__table__.columns
+              if c.name in CrmEntry.__table__.columns and c.name != "id"]
+    db_entry = CrmEntry(id=archived.id, **{field: getattr(archived, field) for field in fields})
+    db.delete(archived)
+    db.add(db_entry)
+    return db_entry
 
 def create_crm_entry(db: Session, entry: CrmEntryCreate):
     # 🛠️ ToDoItems als Liste von Dicts extrahieren:
@@ -128,6 +222,7 @@ def create_crm_entry(db: Session, entry: CrmEntryCreate):
 
     db_entry = CrmEntry(**entry_data)
     db.add(db_entry)
+    enqueue(db, "crm", "crm_created", db_entry.id)
     db.commit()
     db.refresh(db_entry)
     return db_entry
@@ -135,18 +230,21 @@ def create_crm_entry(db: Session, entry: CrmEntryCreate):
 
 def update_crm_entry(db: Session, entry_id: str, updated_entry: CrmEntryUpdate):
     db_entry = db.query(models.CrmEntry).filter(models.CrmEntry.id == entry_id).first()
+    if not db_entry:
+        db_entry = _restore_crm_entry(db, entry_id)
     if not db_entry:
         raise HTTPException(status_code=404, detail="Eintrag nicht gefunden")
 
     for key, value in updated_entry.dict(exclude_unset=True).items():
         setattr(db_entry, key, value)
 
+    enqueue(db, "crm", "crm_updated", entry_id)
     db.commit()
     db.refresh(db_entry)
     return db_entry
 
-def create_crm_entry_from_email(db, anrede, vorname, nachname, mobil, email, nachricht, infos, strasse=None, hausnummer=None, plz=None, ort=None, land=None, informationsgebiet=None, einverstaendnis=None, betreff=None, anfrage_datum=None, kontaktquelle=None):
-    entry = CrmEntry(
+def _crm_entry_from_email(anrede, vorname, nachname, mobil, email, nachricht, infos, strasse=None, hausnummer=None, plz=None, ort=None, land=None, informationsgebiet=None, einverstaendnis=None, betreff=None, anfrage_datum=None, kontaktquelle=None):
+    return CrmEntry(
         id=str(uuid.uuid4()),
         titel=anrede,
         vorname=vorname,
@@ -167,18 +265,33 @@ def create_crm_entry_from_email(db, anrede, vorname, nachname, mobil, email, nac
         status='Auto Email',
         kontaktquelle=kontaktquelle,
     )
+
+def create_crm_entry_from_email(db, **fields):
+    entry = _crm_entry_from_email(**fields)
     db.add(entry)
+    enqueue(db, "crm", "crm_created", entry.id)
     db.commit()
     db.refresh(entry)
     return entry
 
+# Mehrere Mails (auch aus verschiedenen Postfächern) in einer Transaktion anlegen
+def create_crm_entries_from_email(db, records: list):
+    entries = [_crm_entry_from_email(**fields) for fields in records]
+    db.add_all(entries)
+    for entry in entries:
+        enqueue(db, "crm", "crm_created", entry.id)
+    db.commit()
+    return [entry.id for entry in entries]
+
 # ============================
 # 🗑️ Löschen CRM
 # ============================
 def delete_crm_entry(db: Session, entry_id: str):
-    db_entry = db.query(CrmEntry).filter(CrmEntry.id == entry_id).first()
+    db_entry = (db.query(CrmEntry).filter(CrmEntry.id == entry_id).first()
+                or db.query(models.ArchivedCrmEntry).filter(models.ArchivedCrmEntry.id == entry_id).first())
     if not db_entry:
         return False
     db.delete(db_entry)
+    enqueue(db, "crm", "crm_deleted", entry_id)
     db.commit()
     return True
\ No newline at end of file
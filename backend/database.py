@@ -1,27 +1,194 @@
 # database.py
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import os
+from sqlalchemy.orm import Session, sessionmaker
+from metrics import DB_POOL_CHECKOUT_WAIT, DB_POOL_TIMEOUTS, DB_READ_ROUTING, instrument_engine, register_pool
+from settings import DatabaseSettings, READ_YOUR_WRITES_SECONDS
+import profiling
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-DB_USER = os.getenv("DB_USER")
-DB_PASS = os.getenv("DB_PASS")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = 3306
-DB_NAME = os.getenv("DB_NAME")
 
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+def _install_statement_timeout(engine, settings: DatabaseSettings):
+    if not settings.statement_timeout_ms:
+        return
+    if settings.backend == "mysql":
+        statement = f"SET SESSION max_execution_time = {int(settings.statement_timeout_ms)}"
+    elif settings.backend == "postgresql":
+        statement = f"SET statement_timeout = {int(settings.statement_timeout_ms)}"
+    else:
+        logger.info("Statement-Timeout wird für %s nicht unterstützt", settings.backend)
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_timeout(dbapi_conn, record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute(statement)
+        cursor.close()
+
+
+# =======================
+# ⏳ Checkout-Wartezeit
+# =======================
+# Pool-Events feuern erst nach der Vergabe: Start ist der Beginn der Session-Transaktion
+# (direkt vor dem Checkout), Ende das checkout-Event im selben Thread. Ein Neuaufbau
+# (connect-Event) liegt dazwischen und zählt mit. Gilt für QueuePool und StaticPool.
+_checkout_start = threading.local()
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _checkout_requested(session, transaction):
+    if transaction.parent is None:
+        _checkout_start.value = time.perf_counter()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _checkout_abandoned(session, transaction):
+    if transaction.parent is not None:
+        return
+    start = getattr(_checkout_start, "value", None)
+    _checkout_start.value = None
+    if start is None:
+        return
+    # Nie eine Verbindung bekommen: bis zum pool_timeout gewartet → Timeout
+    waited = time.perf_counter() - start
+    pool = getattr(session.bind, "pool", None)
+    timeout = pool.timeout() if isinstance(pool, QueuePool) else None
+    if timeout is not None and waited >= timeout:
+        DB_POOL_TIMEOUTS.inc()
+        DB_POOL_CHECKOUT_WAIT.observe(waited)
+
+
+def _install_checkout_timer(engine):
+    @event.listens_for(engine.pool, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        start = getattr(_checkout_start, "value", None)
+        if start is not None:
+            _checkout_start.value = None
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def create_engine_from_settings(settings: DatabaseSettings, name: str = "primary"):
+    # SQL-Ausgabe läuft über logging (DB_ECHO=1 / SQL_LOG=1), nicht über echo=True
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if settings.echo else logging.WARNING)
+
+    if settings.is_sqlite_memory:
+        # Eine gemeinsame Verbindung, sonst sieht jede Verbindung eine leere DB
+        engine = create_engine(
+            settings.url,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False})
+    else:
+        connect_args = {"check_same_thread": False} if settings.backend == "sqlite" else {}
+        engine = create_engine(
+            settings.url,
+            poolclass=QueuePool,
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_timeout=settings.pool_timeout,
+            pool_recycle=settings.pool_recycle,
+            pool_pre_ping=settings.pool_pre_ping,
+            connect_args=connect_args)
+
+    _install_statement_timeout(engine, settings)
+    _install_checkout_timer(engine)
+    instrument_engine(engine, name)
+    profiling.instrument_engine(engine)
+    register_pool(name, engine)
+    return engine
+
+
+# Engines werden erst in init_engine() angelegt (Lifespan bzw. Skriptstart), nicht beim Import
+settings = DatabaseSettings.from_env()
+replica_settings = DatabaseSettings.replica_from_env()
+engine = None
+replica_engine = None
+_engine_lock = threading.Lock()
+
+
+class _LazySession(Session):
+    # Fallback für Skripte/Shell ohne init_engine(): Engine beim ersten Session-Aufruf anlegen
+    def __init__(self, bind=None, **kwargs):
+        super().__init__(bind=bind if bind is not None else get_engine(), **kwargs)
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=_LazySession)
+# Optionales Read-Replica für die großen Listen-/Gruppierungsabfragen
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=_LazySession)
+
+
+def init_engine():
+    global engine, replica_engine
+    with _engine_lock:
+        if engine is None:
+            primary = create_engine_from_settings(settings)
+            replica = create_engine_from_settings(replica_settings, name="replica") if replica_settings else None
+            SessionLocal.configure(bind=primary)
+            ReadSessionLocal.configure(bind=replica or primary)
+            replica_engine = replica
+            engine = primary
+    return engine
+
+
+def get_engine():
+    return engine if engine is not None else init_engine()
+
+
+def dispose_engines():
+    global engine, replica_engine
+    with _engine_lock:
+        for current in (engine, replica_engine):
+            if current is not None:
+                current.dispose()
+        engine = replica_engine = None
+        SessionLocal.configure(bind=None)
+        ReadSessionLocal.configure(bind=None)
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=10,          # war 5
-    max_overflow=20,       # war 10
-    pool_timeout=30,
-    pool_recycle=1800,      # alle 30 Minuten recyceln
-    echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+
+# =======================
+# ✍️ Read-your-writes
+# =======================
+# Nach einem Schreibzugriff liest derselbe Nutzer für ein kurzes Fenster vom Primary,
+# damit er seine eigenen Änderungen trotz Replikationsverzögerung sieht.
+# Gilt pro Prozess; bei mehreren Workern ggf. Sticky Sessions am Load Balancer nutzen.
+_recent_writes = {}
+_recent_writes_lock = threading.Lock()
+# Einträge, die nie wieder gelesen werden (z.B. ip:… von /token, /register), ab dieser Größe aufräumen
+_RECENT_WRITES_PRUNE_SIZE = 1000
+_next_prune = 0.0
+
+
+def mark_write(identity: str):
+    global _recent_writes, _next_prune
+    if replica_settings is None:
+        return
+    now = time.monotonic()
+    with _recent_writes_lock:
+        _recent_writes[identity] = now + READ_YOUR_WRITES_SECONDS
+        if len(_recent_writes) > _RECENT_WRITES_PRUNE_SIZE and now >= _next_prune:
+            # Höchstens einmal pro Fenster, damit viele aktive Nutzer nicht jeden Write verteuern
+            _recent_writes = {k: deadline for k, deadline in _recent_writes.items() if deadline > now}
+            _next_prune = now + READ_YOUR_WRITES_SECONDS
+
+
+def read_session_for(identity: str):
+    if replica_settings is None:
+        return SessionLocal()
+    now = time.monotonic()
+    with _recent_writes_lock:
+        deadline = _recent_writes.get(identity)
+        if deadline is not None and deadline <= now:
+            del _recent_writes[identity]
+            deadline = None
+    if deadline is not None:
+        DB_READ_ROUTING.inc(target="primary")
+        return SessionLocal()
+    DB_READ_ROUTING.inc(target="replica")
+    return ReadSessionLocal()
@@ -1,20 +1,4 @@
-import imaplib
-import email
 import re
-import os
-import email.utils
-import datetime
-from crud import create_crm_entry_from_email  # Schreibe diese Hilfsfunktion!
-from database import SessionLocal
-from dotenv import load_dotenv  # <--- NEU
-
-# .env laden
-load_dotenv()
-
-IMAP_SERVER = os.getenv("IMAP_SERVER")
-IMAP_USER = os.getenv("IMAP_USER")
-IMAP_PASS = os.getenv("IMAP_PASS")
-SENDER_FILTER = os.getenv("SENDER_FILTER")
 
 def extract_from_html(html):
     def extract_class(cls):
@@ -60,17 +44,21 @@ def extract_informationsgebiet_from_html(html):
         return match.group(1).strip()
     return ""
 
-def parse_kontaktquelle_from_betreff(betreff: str) -> str:
+def parse_kontaktquelle_from_betreff(betreff: str, regeln: dict = None, standard: str = '') -> str:
     if not betreff:
-        return ''
+        return standard
     betreff_lower = betreff.lower()
+    # Postfach-spezifische Regeln (Teilstring → Quelle) haben Vorrang
+    for teil, quelle in (regeln or {}).items():
+        if teil in betreff_lower:
+            return quelle
     if 'ads-conversion' in betreff_lower:
         return 'Ads'
     if 'kontakt' in betreff_lower:
         return 'Website DE'
     if 'contact' in betreff_lower:
         return 'Website EN'
-    return ''
+    return standard
 
 def parse_structured_email(body: str, html: str = None) -> dict:
     # HTML-Priorität für Adress- und Personenfelder
@@ -169,38 +157,6 @@ def parse_structured_email(body: str, html: str = None) -> dict:
     }
 
 def fetch_and_process_emails():
-    imap = imaplib.IMAP4_SSL(IMAP_SERVER)
-    imap.login(IMAP_USER, IMAP_PASS)
-    imap.select("INBOX")
-    status, messages = imap.search(None, f'(UNSEEN FROM "{SENDER_FILTER}")')
-    db = SessionLocal()
-    for num in messages[0].split():
-        status, data = imap.fetch(num, "(RFC822)")
-        msg = email.message_from_bytes(data[0][1])
-        subject = msg["Subject"] if msg["Subject"] else ""
-        # Anfrage-Datum aus E-Mail-Header
-        date_tuple = email.utils.parsedate_tz(msg["Date"])
-        anfrage_datum = None
-        if date_tuple:
-            anfrage_datum = datetime.datetime.fromtimestamp(email.utils.mktime_tz(date_tuple))
-        if msg.is_multipart():
-            body = ""
-            html = None
-            for part in msg.walk():
-                if part.get_content_type() == "text/plain":
-                    body += part.get_payload(decode=True).decode()
-                elif part.get_content_type() == "text/html":
-                    html = part.get_payload(decode=True).decode()
-        else:
-            body = msg.get_payload(decode=True).decode()
-            html = None
-        fields = parse_structured_email(body, html)
-        fields["betreff"] = subject
-        fields["anfrage_datum"] = anfrage_datum
-        # Kontaktquelle aus Betreff extrahieren
-        fields["kontaktquelle"] = parse_kontaktquelle_from_betreff(subject)
-        print("Extrahierte Felder:", fields)  # Debug-Ausgabe
-        create_crm_entry_from_email(db, **fields)
-        imap.store(num, '+FLAGS', '\\Seen')
-    imap.logout()
-    db.close()
\ No newline at end of file
+    # Ein Durchlauf über alle konfigurierten Postfächer (EMAIL_SOURCES oder IMAP_SERVER/SENDER_FILTER)
+    from ingestion import run_once
+    return run_once()
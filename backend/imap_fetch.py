@@ -0,0 +1,245 @@
+# imap_fetch.py
+# Teil-Abruf per IMAP: statt der kompletten Mail (RFC822 inkl. Anhänge) nur Header,
+# BODYSTRUCTURE und die text/plain- bzw. text/html-Teile holen und stückweise dekodieren.
+import binascii
+import codecs
+import datetime
+import email.policy
+import email.utils
+import imaplib
+import os
+import re
+from email.parser import BytesHeaderParser
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Obergrenze je Textteil (Partial Fetch); riesige Textteile werden abgeschnitten
+MAX_TEXT_PART_BYTES = int(os.getenv("IMAP_MAX_TEXT_PART_BYTES", str(1024 * 1024)))
+# Nachrichten je FETCH für Header + Struktur
+FETCH_BATCH_SIZE = int(os.getenv("IMAP_FETCH_BATCH_SIZE", "50"))
+DECODE_CHUNK_BYTES = 64 * 1024
+
+HEADER_SECTION = "HEADER.FIELDS (SUBJECT DATE FROM)"
+
+_OPEN, _CLOSE = object(), object()
+_TOKEN_RE = re.compile(
+    rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|\{(\d+)\}'
+    rb'|([^\s()"\[]+(?:\[[^\]]*\](?:<[^>]*>)?)?))'
+)
+
+
+class TextPart(NamedTuple):
+    section: str
+    subtype: str  # plain / html
+    charset: str
+    encoding: str
+    size: int
+
+
+class MailContent(NamedTuple):
+    subject: str
+    sender: str
+    anfrage_datum: Optional[datetime.datetime]
+    body: str
+    html: Optional[str]
+
+
+# =======================
+# 🧩 FETCH-Antwort parsen
+# =======================
+def _tokens(data) -> Iterator:
+    # imaplib liefert [(b'1 (… {n}', literal), b')', …]; Literale hängen am Ende ihres Präfixes.
+    # Atome kommen als str, Strings/Literale als bytes, NIL als None.
+    for item in data:
+        if item is None:
+            continue
+        text, literal = item if isinstance(item, tuple) else (item, None)
+        pos = 0
+        while True:
+            match = _TOKEN_RE.match(text, pos)
+            if not match:
+                break
+            pos = match.end()
+            if match.group(1):
+                yield _OPEN
+            elif match.group(2):
+                yield _CLOSE
+            elif match.group(3) is not None:
+                yield re.sub(rb"\\(.)", rb"\1", match.group(3))
+            elif match.group(4) is not None:
+                yield literal if literal is not None else b""
+            else:
+                atom = match.group(5).decode("ascii", "replace")
+                yield None if atom.upper() == "NIL" else atom
+
+
+def _parse_list(tokens: Iterator) -> list:
+    items = []
+    for token in tokens:
+        if token is _CLOSE:
+            return items
+        if token is _OPEN:
+            items.append(_parse_list(tokens))
+        else:
+            items.append(token)
+    return items
+
+
+def _section_key(key: str) -> str:
+    # BODY[1]<0> → BODY[1]; Groß-/Kleinschreibung der Server vereinheitlichen
+    return re.sub(r"<\d+>$", "", key).upper()
+
+
+def parse_fetch_response(data) -> Dict[int, Dict[str, object]]:
+    messages: Dict[int, Dict[str, object]] = {}
+    tokens = _tokens(data)
+    current = None
+    for token in tokens:
+        if isinstance(token, str) and token.isdigit():
+            current = int(token)
+        elif token is _OPEN and current is not None:
+            items = _parse_list(tokens)
+            attributes = messages.setdefault(current, {})
+            for key, value in zip(items[0::2], items[1::2]):
+                attributes[_section_key(str(key))] = value
+            current = None
+    return messages
+
+
+# =======================
+# 🌳 BODYSTRUCTURE
+# =======================
+def _text(value) -> str:
+    if value is None:
+        return ""
+    return (value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)).lower()
+
+
+def _params(value) -> Dict[str, str]:
+    if not isinstance(value, list):
+        return {}
+    return {_text(k): _text(v) for k, v in zip(value[0::2], value[1::2])}
+
+
+def find_text_parts(structure, section: str = "") -> List[TextPart]:
+    if not isinstance(structure, list) or not structure:
+        return []
+    if isinstance(structure[0], list):
+        # multipart: erst die Kind-Teile, danach Subtyp und Erweiterungsdaten
+        parts = []
+        for index, child in enumerate(structure):
+            if not isinstance(child, list):
+                break
+            parts.extend(find_text_parts(child, f"{section}.{index + 1}" if section else str(index + 1)))
+        return parts
+
+    main_type, subtype = _text(structure[0]), _text(structure[1])
+    if main_type != "text" or subtype not in ("plain", "html"):
+        # Anhänge, Bilder, weitergeleitete Mails (message/rfc822) werden nicht geladen
+        return []
+    # text-Teil: type subtype params id description encoding size lines [md5 disposition …]
+    disposition = structure[9] if len(structure) > 9 else None
+    if isinstance(disposition, list) and disposition and _text(disposition[0]) == "attachment":
+        return []
+    size = structure[6]
+    return [TextPart(
+        section=section or "1",
+        subtype=subtype,
+        charset=_params(structure[2]).get("charset") or "utf-8",
+        encoding=_text(structure[5]) or "7bit",
+        size=int(size) if isinstance(size, str) and size.isdigit() else 0,
+    )]
+
+
+# =======================
+# 🔤 Dekodieren
+# =======================
+def _lines(raw: bytes) -> Iterator[bytes]:
+    # In Blöcken an Zeilengrenzen – so bleiben Base64-Quads und QP-Soft-Breaks zusammen
+    start = 0
+    while start < len(raw):
+        end = raw.find(b"\n", start + DECODE_CHUNK_BYTES)
+        end = len(raw) if end == -1 else end + 1
+        yield raw[start:end]
+        start = end
+
+
+def _transfer_decode(chunk: bytes, encoding: str) -> bytes:
+    if encoding == "base64":
+        try:
+            return binascii.a2b_base64(chunk)
+        except binascii.Error:
+            # Abgeschnittener Rest nach Partial Fetch: nur vollständige Quads dekodieren
+            compact = b"".join(chunk.split())
+            try:
+                return binascii.a2b_base64(compact[:len(compact) // 4 * 4])
+            except binascii.Error:
+                return b""
+    if encoding == "quoted-printable":
+        return binascii.a2b_qp(chunk)
+    return chunk
+
+
+def decode_part(raw: bytes, encoding: str, charset: str) -> str:
+    try:
+        decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pieces = [decoder.decode(_transfer_decode(chunk, encoding)) for chunk in _lines(raw)]
+    pieces.append(decoder.decode(b"", final=True))
+    return "".join(pieces)
+
+
+# =======================
+# 📬 Abruf
+# =======================
+def _fetch_ok(imap, message_set: str, items: str, uid: bool = False):
+    # uid=True: message_set sind UIDs (stabil über lange offene Verbindungen), Ergebnis nach UID
+    status, data = imap.uid("FETCH", message_set, items) if uid else imap.fetch(message_set, items)
+    if status != "OK":
+        # z.B. NO für eine inzwischen gelöschte Nachricht
+        raise imaplib.IMAP4.error(f"IMAP FETCH {items} fehlgeschlagen: {status}")
+    messages = parse_fetch_response(data)
+    if uid:
+        return {int(attrs["UID"]): attrs for attrs in messages.values() if str(attrs.get("UID", "")).isdigit()}
+    return messages
+
+
+def fetch_envelopes(imap, nums: List[bytes], uid: bool = False) -> Dict[int, Dict[str, object]]:
+    # Header + BODYSTRUCTURE für mehrere Nachrichten in wenigen Roundtrips
+    envelopes: Dict[int, Dict[str, object]] = {}
+    for start in range(0, len(nums), FETCH_BATCH_SIZE):
+        batch = b",".join(nums[start:start + FETCH_BATCH_SIZE]).decode()
+        envelopes.update(_fetch_ok(imap, batch, f"(BODYSTRUCTURE BODY.PEEK[{HEADER_SECTION}])", uid))
+    return envelopes
+
+
+def fetch_content(imap, num: int, envelope: Dict[str, object], uid: bool = False) -> MailContent:
+    # Server geben die Feldliste unterschiedlich zurück (Groß-/Kleinschreibung, Anführungszeichen)
+    raw_headers = next((v for k, v in envelope.items() if k.startswith("BODY[HEADER")), None)
+    headers = BytesHeaderParser(policy=email.policy.default).parsebytes(raw_headers or b"")
+    subject = str(headers["Subject"] or "")
+    sender = str(headers["From"] or "")
+    anfrage_datum = None
+    date_tuple = email.utils.parsedate_tz(str(headers["Date"] or ""))
+    if date_tuple:
+        anfrage_datum = datetime.datetime.fromtimestamp(email.utils.mktime_tz(date_tuple))
+
+    parts = find_text_parts(envelope.get("BODYSTRUCTURE"))
+    body, html = "", None
+    if parts:
+        sections = " ".join(
+            f"BODY.PEEK[{p.section}]" + (f"<0.{MAX_TEXT_PART_BYTES}>" if p.size > MAX_TEXT_PART_BYTES else "")
+            for p in parts
+        )
+        fetched = _fetch_ok(imap, str(num), f"({sections})", uid).get(num, {})
+        for part in parts:
+            text = decode_part(fetched.get(f"BODY[{part.section}]") or b"", part.encoding, part.charset)
+            if part.subtype == "plain":
+                body += text
+            else:
+                html = text
+    return MailContent(subject, sender, anfrage_datum, body, html)
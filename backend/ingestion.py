@@ -0,0 +1,350 @@
+# ingestion.py
+# Paralleler E-Mail-Import aus mehreren Postfächern: ein Worker-Thread je Quelle
+# (eigene, wiederverwendete IMAP-Verbindung) und ein gemeinsamer Writer, der die
+# CRM-Einträge aller Quellen gebündelt in die Datenbank schreibt.
+import datetime
+import imaplib
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+import crud
+from database import SessionLocal
+from email_service import parse_kontaktquelle_from_betreff, parse_structured_email
+from imap_fetch import fetch_content, fetch_envelopes
+from metrics import (EMAIL_INGEST_ERRORS, EMAIL_INGEST_LAG, EMAIL_INGEST_LATENCY, EMAIL_POLL_DURATION,
+                     EMAIL_SOURCE_BACKLOG, EMAIL_WRITE_BATCH, EMAILS_INGESTED)
+from settings import MailSource, mail_sources_from_env
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EMAIL_WRITE_BATCH_SIZE = int(os.getenv("EMAIL_WRITE_BATCH_SIZE", "200"))
+EMAIL_WRITE_MAX_WAIT = float(os.getenv("EMAIL_WRITE_MAX_WAIT_SECONDS", "0.2"))
+EMAIL_IMAP_TIMEOUT = float(os.getenv("EMAIL_IMAP_TIMEOUT_SECONDS", "60"))
+EMAIL_RECONNECT_BACKOFF_MAX = 300.0
+# Nach so vielen fehlgeschlagenen Importversuchen wird eine Mail nicht mehr automatisch wiederholt
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+
+
+# =======================
+# 💾 Gemeinsamer Writer
+# =======================
+class BulkWriter(threading.Thread):
+    def __init__(self, batch_size: int = EMAIL_WRITE_BATCH_SIZE, max_wait: float = EMAIL_WRITE_MAX_WAIT):
+        super().__init__(name="email-writer", daemon=True)
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._stop_event = threading.Event()
+
+    def submit(self, records: List[dict]) -> Future:
+        # Ergebnis: Liste mit True/False je Datensatz (angelegt oder nicht)
+        future: Future = Future()
+        self._queue.put((records, future))
+        return future
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def run(self):
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            try:
+                pending = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            # Kurz auf weitere Quellen warten, um mehr in einen Commit zu packen
+            deadline = time.monotonic() + self.max_wait
+            count = len(pending[0][0])
+            while count < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                pending.append(item)
+                count += len(item[0])
+            self._write(pending)
+
+    def _write(self, pending: List[tuple]):
+        records = [record for batch, _ in pending for record in batch]
+        try:
+            with SessionLocal() as db:
+                try:
+                    crud.create_crm_entries_from_email(db, records)
+                    results = [True] * len(records)
+                except Exception:
+                    # Fehlerhaften Datensatz isolieren: einzeln nachschreiben
+                    db.rollback()
+                    logger.warning("Bulk-Import fehlgeschlagen, schreibe %s Einträge einzeln", len(records),
+                                   exc_info=True)
+                    results = []
+                    for record in records:
+                        try:
+                            crud.create_crm_entries_from_email(db, [record])
+                            results.append(True)
+                        except Exception:
+                            db.rollback()
+                            logger.exception("CRM-Eintrag aus E-Mail konnte nicht angelegt werden")
+                            results.append(False)
+            EMAIL_WRITE_BATCH.observe(len(records))
+        except Exception as exc:
+            for _, future in pending:
+                future.set_exception(exc)
+            return
+        offset = 0
+        for batch, future in pending:
+            future.set_result(results[offset:offset + len(batch)])
+            offset += len(batch)
+
+
+# =======================
+# 📥 Worker je Postfach
+# =======================
+def search_criteria(source: MailSource) -> str:
+    if "*" in source.senders:
+        return "UNSEEN"
+    # Mehrere Absender: OR FROM a OR FROM b FROM c
+    criteria = f'FROM "{source.senders[-1]}"'
+    for sender in reversed(source.senders[:-1]):
+        criteria = f'OR FROM "{sender}" {criteria}'
+    return f"(UNSEEN {criteria})"
+
+
+class SourceWorker(threading.Thread):
+    def __init__(self, source: MailSource, writer: BulkWriter, stop_event: threading.Event):
+        super().__init__(name=f"email-{source.name}", daemon=True)
+        self.source = source
+        self.writer = writer
+        self.stop_event = stop_event
+        self.imap: Optional[imaplib.IMAP4] = None
+        self._failures = 0
+        self._attempts: Dict[int, int] = {}  # UID → fehlgeschlagene Importversuche
+
+    def run(self):
+        while not self.stop_event.is_set():
+            ok = self.poll_safely()
+            # Nach Verbindungsfehlern exponentiell länger warten
+            delay = self.source.poll_interval if ok else min(
+                EMAIL_RECONNECT_BACKOFF_MAX, self.source.poll_interval * 2 ** min(self._failures, 8))
+            self.stop_event.wait(delay)
+        self.disconnect()
+
+    # =======================
+    # 🔌 Verbindung
+    # =======================
+    def connection(self) -> imaplib.IMAP4:
+        if self.imap is not None:
+            try:
+                self.imap.noop()
+                return self.imap
+            except (imaplib.IMAP4.error, OSError):
+                self.disconnect()
+        imap = imaplib.IMAP4_SSL(self.source.server, self.source.port, timeout=EMAIL_IMAP_TIMEOUT)
+        imap.login(self.source.user, self.source.password)
+        status, _ = imap.select(self.source.mailbox)
+        if status != "OK":
+            imap.logout()
+            raise imaplib.IMAP4.error(f"Postfach {self.source.mailbox} nicht verfügbar")
+        self.imap = imap
+        return imap
+
+    def disconnect(self):
+        if self.imap is None:
+            return
+        try:
+            self.imap.logout()
+        except (imaplib.IMAP4.error, OSError):
+            pass
+        self.imap = None
+
+    # =======================
+    # 🔁 Ein Abruf
+    # =======================
+    def poll_safely(self) -> bool:
+        # Unerwartete Fehler (Parser, Writer, Server-Antworten) dürfen den Worker nicht beenden
+        try:
+            return self.poll_once()
+        except Exception:
+            EMAIL_INGEST_ERRORS.inc(source=self.source.name, stage="worker")
+            logger.exception("E-Mail-Worker für %s fehlgeschlagen", self.source.name)
+            self.disconnect()
+            self._failures += 1
+            return False
+
+    def poll_once(self) -> bool:
+        name = self.source.name
+        start = time.perf_counter()
+        try:
+            imap = self.connection()
+            status, data = imap.uid("SEARCH", None, search_criteria(self.source))
+            if status != "OK":
+                raise imaplib.IMAP4.error(f"SEARCH fehlgeschlagen: {status}")
+            uids = data[0].split()
+            EMAIL_SOURCE_BACKLOG.set(len(uids), source=name)
+            if uids:
+                self._process(imap, uids)
+            self._failures = 0
+            return True
+        except (imaplib.IMAP4.error, OSError):
+            EMAIL_INGEST_ERRORS.inc(source=name, stage="imap")
+            logger.exception("IMAP-Abruf für %s fehlgeschlagen", name)
+            self.disconnect()
+            self._failures += 1
+            return False
+        finally:
+            EMAIL_POLL_DURATION.observe(time.perf_counter() - start, source=name)
+
+    def _process(self, imap: imaplib.IMAP4, uids: List[bytes]):
+        name = self.source.name
+        # Nur UIDs merken, die noch ungelesen im Postfach liegen
+        current = {int(raw_uid) for raw_uid in uids}
+        self._attempts = {uid: count for uid, count in self._attempts.items() if uid in current}
+        envelopes = fetch_envelopes(imap, uids, uid=True)
+        records, record_uids, dates, failed = [], [], [], []
+        for raw_uid in uids:
+            uid = int(raw_uid)
+            started = time.perf_counter()
+            envelope = envelopes.get(uid)
+            if not envelope or not envelope.get("BODYSTRUCTURE"):
+                # Zwischen SEARCH und FETCH gelöscht oder unvollständige Antwort – nichts anlegen
+                EMAIL_INGEST_ERRORS.inc(source=name, stage="envelope")
+                logger.warning("E-Mail %s aus %s ohne BODYSTRUCTURE, übersprungen", uid, name)
+                failed.append(uid)
+                continue
+            try:
+                mail = fetch_content(imap, uid, envelope, uid=True)
+            except (imaplib.IMAP4.abort, OSError):
+                raise
+            except Exception:
+                EMAIL_INGEST_ERRORS.inc(source=name, stage="fetch")
+                logger.exception("E-Mail %s aus %s konnte nicht abgerufen werden", uid, name)
+                failed.append(uid)
+                continue
+            try:
+                fields = parse_structured_email(mail.body, mail.html)
+                fields["betreff"] = mail.subject
+                fields["anfrage_datum"] = mail.anfrage_datum
+                fields["kontaktquelle"] = parse_kontaktquelle_from_betreff(
+                    mail.subject, self.source.kontaktquelle, self.source.default_kontaktquelle)
+            except Exception:
+                EMAIL_INGEST_ERRORS.inc(source=name, stage="parse")
+                logger.exception("E-Mail %s aus %s konnte nicht ausgewertet werden", uid, name)
+                failed.append(uid)
+                continue
+            logger.debug("Extrahierte Felder (%s): %s", name, fields)
+            records.append(fields)
+            record_uids.append(uid)
+            dates.append(mail.anfrage_datum)
+            EMAIL_INGEST_LATENCY.observe(time.perf_counter() - started, source=name)
+
+        if records:
+            try:
+                results = self.writer.submit(records).result()
+            except Exception:
+                EMAIL_INGEST_ERRORS.inc(len(records), source=name, stage="db")
+                logger.exception("CRM-Einträge aus %s konnten nicht geschrieben werden", name)
+                # Gesamter Writer ausgefallen (z.B. DB weg) – zählt nicht gegen die einzelnen Mails
+                results = None
+            if results is not None:
+                self._finish(imap, record_uids, dates, results)
+                failed.extend(uid for uid, ok in zip(record_uids, results) if not ok)
+        self._record_failures(imap, failed)
+
+    def _finish(self, imap: imaplib.IMAP4, record_uids: List[int], dates: list, results: List[bool]):
+        name = self.source.name
+        done = [uid for uid, ok in zip(record_uids, results) if ok]
+        failed = len(results) - len(done)
+        if failed:
+            EMAIL_INGEST_ERRORS.inc(failed, source=name, stage="db")
+        if not done:
+            return
+        # PEEK setzt \Seen nicht – erst nach erfolgreichem Commit markieren, ein STORE für alle
+        imap.uid("STORE", ",".join(str(uid) for uid in done), "+FLAGS", "\\Seen")
+        for uid in done:
+            self._attempts.pop(uid, None)
+        EMAILS_INGESTED.inc(len(done), source=name)
+        now = datetime.datetime.now()
+        for anfrage_datum, ok in zip(dates, results):
+            if ok and anfrage_datum:
+                EMAIL_INGEST_LAG.observe(max(0.0, (now - anfrage_datum).total_seconds()), source=name)
+
+    def _record_failures(self, imap: imaplib.IMAP4, failed: List[int]):
+        exhausted = []
+        for uid in failed:
+            self._attempts[uid] = self._attempts.get(uid, 0) + 1
+            if self._attempts[uid] >= EMAIL_MAX_ATTEMPTS:
+                exhausted.append(uid)
+        if exhausted:
+            self._quarantine(imap, exhausted)
+
+    def _quarantine(self, imap: imaplib.IMAP4, uids: List[int]):
+        # Nicht endlos wiederholen: in den Quarantäne-Ordner kopieren (falls konfiguriert) und
+        # als gelesen + markiert kennzeichnen, damit jemand die Mail von Hand prüft
+        name = self.source.name
+        message_set = ",".join(str(uid) for uid in uids)
+        if self.source.quarantine_mailbox:
+            status, _ = imap.uid("COPY", message_set, self.source.quarantine_mailbox)
+            if status != "OK":
+                logger.error("Quarantäne-Ordner %s für %s nicht beschreibbar", self.source.quarantine_mailbox, name)
+        imap.uid("STORE", message_set, "+FLAGS", "(\\Seen \\Flagged)")
+        for uid in uids:
+            self._attempts.pop(uid, None)
+        EMAIL_INGEST_ERRORS.inc(len(uids), source=name, stage="quarantine")
+        logger.warning("%s E-Mail(s) aus %s nach %s Versuchen aufgegeben: UIDs %s",
+                       len(uids), name, EMAIL_MAX_ATTEMPTS, message_set)
+
+
+# =======================
+# 🧭 Manager
+# =======================
+class IngestionManager:
+    def __init__(self, sources: List[MailSource]):
+        self.sources = sources
+        self.stop_event = threading.Event()
+        self.writer = BulkWriter()
+        self.workers = [SourceWorker(source, self.writer, self.stop_event) for source in sources]
+
+    def start(self):
+        self.writer.start()
+        for worker in self.workers:
+            worker.start()
+        logger.info("E-Mail-Import gestartet: %s", ", ".join(s.name for s in self.sources))
+
+    def stop(self):
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join()
+        self.writer.stop()
+
+
+def run_once(sources: Optional[List[MailSource]] = None) -> dict:
+    # Ein Durchlauf je Quelle, parallel; für Cron/Einmal-Aufrufe
+    sources = mail_sources_from_env() if sources is None else sources
+    if not sources:
+        logger.warning("Keine E-Mail-Quellen konfiguriert (EMAIL_SOURCES oder IMAP_SERVER)")
+        return {}
+    writer = BulkWriter()
+    writer.start()
+    stop_event = threading.Event()
+    workers = [SourceWorker(source, writer, stop_event) for source in sources]
+    results = {}
+
+    def _run(worker: SourceWorker):
+        results[worker.source.name] = worker.poll_safely()
+        worker.disconnect()
+
+    threads = [threading.Thread(target=_run, args=(w,), name=f"email-{w.source.name}") for w in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.stop()
+    return results
@@ -0,0 +1,41 @@
+# logging_config.py
+# Zentrales, per Umgebungsvariablen gesteuertes Logging (ersetzt echo=True und print()).
+import json
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Standardattribute eines LogRecords – alles andere kam über extra={...}
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def configure_logging():
+    # LOG_LEVEL=DEBUG|INFO|WARNING…, LOG_FORMAT=json|text (SQL-Ausgabe: DB_ECHO, siehe settings.py)
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    handler = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
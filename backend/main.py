@@ -1,38 +1,98 @@
 # main.py
 from datetime import timedelta
-from fastapi import FastAPI, Depends, HTTPException, WebSocket, status, WebSocketDisconnect, APIRouter
+from fastapi import FastAPI, Depends, HTTPException, Request, WebSocket, status, WebSocketDisconnect, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, JSONResponse, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from database import Base, engine, SessionLocal
+from database import SessionLocal, dispose_engines, init_engine, mark_write, read_session_for
 from models import User
 import crud, schemas, auth, grouping
 from auth import get_current_user
 from auth import decode_token
 from auth import get_user_by_username
-from typing import List
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from models import Note, User, CrmEntry
 from grouping import group_notes
 from schemas import NoteOut
-from schemas import CrmEntryCreate, CrmEntryOut, CrmEntryUpdate
+from schemas import CrmEntryCreate, CrmEntryOut, CrmEntryUpdate, CrmEntryWithNotes
+import os
 import uuid
-
-app = FastAPI()
-Base.metadata.create_all(bind=engine)
-
+import asyncio
+from contextlib import asynccontextmanager
+import archive
+from outbox import OutboxWorker
+from logging_config import configure_logging
+from metrics import MetricsMiddleware, render_metrics
+from realtime import manager, TOPICS
+import profiling
+from profiling import ProfiledRoute, ProfilingMiddleware
+from admission import AdmissionMiddleware
+import wire
+from wire import CompressionMiddleware
+
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engine erst hier anlegen; das Schema pflegt migrate.py (einmal pro Deployment)
+    engine = init_engine()
+    if os.getenv("MIGRATE_ON_STARTUP", "").lower() in ("1", "true", "yes"):
+        # Nur für lokale Entwicklung/Einzelinstanz – in Produktion migrate.py vor dem Rollout
+        import migrations
+        await asyncio.to_thread(migrations.upgrade, engine)
+    tasks = []
+    if archive.ARCHIVE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(archive.archive_loop()))
+    await manager.start()
+    await outbox_worker.start()
+    yield
+    await outbox_worker.stop()
+    await manager.stop()
+    for task in tasks:
+        task.cancel()
+    dispose_engines()
+
+app = FastAPI(lifespan=lifespan)
+# Sync-Handler für das Profiling im Threadpool-Thread registrieren
+app.router.route_class = ProfiledRoute
+
+# Innerste Middleware, damit auch 503/429 CORS-Header bekommen
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"]
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
 
-def get_db():
+def get_db(request: Request):
+    is_write = request.method not in READ_METHODS
+    if is_write:
+        identity = auth.request_identity(request)
+        mark_write(identity)
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+        if is_write:
+            # Fenster ab Commit-Ende neu starten
+            mark_write(identity)
+
+# Für die großen Lese-Endpunkte: Replica, außer der Nutzer hat gerade geschrieben
+def get_read_db(request: Request):
+    db = read_session_for(auth.request_identity(request))
+    try:
+        yield db
+    finally:
+        db.close()
 
 @app.post("/register/", response_model=schemas.User)
 def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -60,40 +120,49 @@ def login_for_access_token(
     return {"access_token": token, "token_type": "bearer"}
 
 @app.get("/notes/", response_model=List[schemas.NoteOut])
-def read_notes(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    notes = crud.get_all_notes(db)
+def read_notes(request: Request, response: Response, include_archived: bool = False, db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    # Format hängt am Accept-Header – Caches müssen die Varianten trennen
+    response.headers["Vary"] = "Accept"
+    notes = crud.get_all_notes(db, include_archived=include_archived)
+    compact = wire.compact_response(request, notes, schemas.NoteOut)
+    if compact is not None:
+        return compact
     return [schemas.NoteOut.from_orm(n) for n in notes]
 
+# Broadcasts laufen über den Outbox-Worker; die Handler committen nur und wecken ihn.
 @app.post("/notes/", response_model=schemas.NoteOut, status_code=201)
-async def create_note(note: schemas.NoteCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def create_note(note: schemas.NoteCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     db_note = crud.create_note(db, note, user_id=current_user.id)
-    await broadcast_update({"event": "note_created", "id": db_note.id})
+    outbox_worker.wake()
     return db_note
 
 @app.put("/notes/{note_id}", response_model=schemas.NoteOut)
-async def update_note(note_id: int, note: schemas.NoteUpdate, db: Session = Depends(get_db)):
+def update_note(note_id: int, note: schemas.NoteUpdate, db: Session = Depends(get_db)):
     db_note = crud.update_note(db, note_id, note)
     if not db_note:
         raise HTTPException(status_code=404, detail="Notiz nicht gefunden")
-    await broadcast_update({"event": "note_updated", "id": db_note.id})
+    outbox_worker.wake()
     return db_note
 
 @app.delete("/notes/{note_id}", status_code=204)
-async def delete_note(note_id: int, db: Session = Depends(get_db)):
+def delete_note(note_id: int, db: Session = Depends(get_db)):
     if not crud.delete_note(db, note_id):
         raise HTTPException(status_code=404, detail="Notiz nicht gefunden")
-    await broadcast_update({"event": "note_deleted", "id": note_id})
+    outbox_worker.wake()
 
 @app.get("/notes/grouped", response_model=List[List[schemas.NoteOut]])
-def get_grouped_notes(db: Session = Depends(get_db)):
+def get_grouped_notes(request: Request, response: Response, include_archived: bool = False, db: Session = Depends(get_read_db)):
+    response.headers["Vary"] = "Accept"
     all_notes = db.query(Note).all()
+    if include_archived:
+        all_notes += crud.get_archived_notes(db)
     grouped = grouping.group_notes(all_notes)
+    compact = wire.compact_grouped_response(request, grouped, schemas.NoteOut)
+    if compact is not None:
+        return compact
     return [[schemas.NoteOut.from_orm(n) for n in group] for group in grouped]
 
 
-clients: List[WebSocket] = []
-crm_clients: List[WebSocket] = []
-
 @app.get("/notes/{note_id}", response_model=schemas.NoteOut)
 def get_note(note_id: int, db: Session = Depends(get_db)):
     note = crud.get_note_by_id(db, note_id)
@@ -101,116 +170,119 @@ def get_note(note_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Notiz nicht gefunden")
     return schemas.NoteOut.from_orm(note)
 
-@app.websocket("/ws/notes")
-async def websocket_endpoint(websocket: WebSocket):
-    token = websocket.query_params.get("token")
+# 🔐 Token prüfen & User holen – DB danach direkt schließen
+def _authenticate_websocket_token(token: Optional[str]):
     if not token:
-        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-        return
-
-    # Token validieren & User holen – aber DB danach direkt schließen
+        return None
+    payload = decode_token(token)
+    if payload is None or not payload.get("sub"):
+        return None
     with SessionLocal() as db:
-        payload = decode_token(token)
-        if payload is None:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
+        if not get_user_by_username(db, payload["sub"]):
+            return None
+    return payload
 
-        username = payload.get("sub")
-        if not username:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-
-        user = get_user_by_username(db, username)
-        if not user:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-
-    # DB geschlossen, Verbindung kann geöffnet werden
-    await websocket.accept()
-    clients.append(websocket)
-
-    try:
-        while True:
-            await websocket.receive_text()  # hält Verbindung offen
-    except WebSocketDisconnect:
-        clients.remove(websocket)
-
-
-@app.websocket("/ws/crm")
-async def crm_websocket(websocket: WebSocket):
-    token = websocket.query_params.get("token")
-    if not token:
+async def _serve_websocket(websocket: WebSocket, topics: set, endpoint: str, heartbeat: bool):
+    payload = await asyncio.to_thread(_authenticate_websocket_token, websocket.query_params.get("token"))
+    if payload is None:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
+    encoding = wire.websocket_encoding(websocket.query_params.get("encoding"))
+    conn = await manager.connect(websocket, payload["sub"], topics, payload.get("exp"), endpoint, heartbeat, encoding)
+    await manager.serve(conn)
+
+# Ein Socket für alles: /ws?token=…&topics=notes,crm[&encoding=msgpack]
+# Nachrichten vom Client: {"event": "pong"}, {"action": "subscribe"/"unsubscribe", "topics": [...]}
+@app.websocket("/ws")
+async def multiplexed_websocket(websocket: WebSocket):
+    requested = websocket.query_params.get("topics")
+    topics = {t for t in requested.split(",") if t in TOPICS} if requested else set(TOPICS)
+    await _serve_websocket(websocket, topics, "multiplex", heartbeat=True)
+
+# Bestehende Endpunkte für ältere App-Versionen
+@app.websocket("/ws/notes")
+async def websocket_endpoint(websocket: WebSocket):
+    await _serve_websocket(websocket, {"notes"}, "notes", heartbeat=False)
 
-    # Authentifiziere kurz mit temporärer DB-Session
-    with SessionLocal() as db:
-        payload = decode_token(token)
-        if payload is None:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-
-        username = payload.get("sub")
-        if not username:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-
-        user = get_user_by_username(db, username)
-        if not user:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-
-    # DB ist geschlossen, Verbindung kann weitergehen
-    await websocket.accept()
-    crm_clients.append(websocket)
-
-    try:
-        while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        crm_clients.remove(websocket)
+@app.websocket("/ws/crm")
+async def crm_websocket(websocket: WebSocket):
+    await _serve_websocket(websocket, {"crm"}, "crm", heartbeat=False)
 
 async def broadcast_update(data: dict):
-    to_remove = []
-    for client in clients:
-        try:
-            await client.send_json(data)
-        except:
-            to_remove.append(client)
-    for c in to_remove:
-        clients.remove(c)
+    await manager.broadcast("notes", data)
 
 async def broadcast_crm_update(data: dict):
-    to_remove = []
-    for client in crm_clients:
-        try:
-            await client.send_json(data)
-        except:
-            to_remove.append(client)
-    for c in to_remove:
-        crm_clients.remove(c)
-
-@app.get("/crm/", response_model=List[CrmEntryOut])
-def get_crm_entries(db: Session = Depends(get_db)):
-    return crud.get_all_crm_entries(db)
+    await manager.broadcast("crm", data)
+
+outbox_worker = OutboxWorker({"notes": broadcast_update, "crm": broadcast_crm_update})
+
+@app.get("/crm/", response_model=List[CrmEntryOut],
+         responses={200: {"model": List[CrmEntryWithNotes], "description": "Mit ?include=notes inkl. Notizen"}})
+def get_crm_entries(
+    request: Request,
+    response: Response,
+    include: Optional[str] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    response.headers["Vary"] = "Accept"
+    include_notes = include == "notes"
+    entries = crud.get_all_crm_entries(db, skip=skip, limit=limit, include_notes=include_notes,
+                                       include_archived=include_archived)
+    compact = wire.compact_response(request, entries, CrmEntryWithNotes if include_notes else CrmEntryOut)
+    if compact is not None:
+        return compact
+    if include_notes:
+        return JSONResponse(jsonable_encoder([CrmEntryWithNotes.model_validate(e, from_attributes=True) for e in entries]),
+                            headers={"Vary": "Accept"})
+    return entries
+
+@app.get("/crm/{entry_id}", response_model=CrmEntryOut,
+         responses={200: {"model": CrmEntryWithNotes, "description": "Mit ?include=notes inkl. Notizen"}})
+def get_crm_entry(entry_id: str, include: Optional[str] = None, db: Session = Depends(get_read_db)):
+    include_notes = include == "notes"
+    entry = crud.get_crm_entry_by_id(db, entry_id, include_notes=include_notes)
+    if not entry:
+        raise HTTPException(status_code=404, detail="CRM-Eintrag nicht gefunden")
+    if include_notes:
+        return JSONResponse(jsonable_encoder(CrmEntryWithNotes.model_validate(entry, from_attributes=True)))
+    return entry
 
 @app.post("/crm/", response_model=CrmEntryOut, status_code=201)
-async def create_crm_entry(entry: CrmEntryCreate, db: Session = Depends(get_db)):
+def create_crm_entry(entry: CrmEntryCreate, db: Session = Depends(get_db)):
     created = crud.create_crm_entry(db, entry)
-    await broadcast_crm_update({"event": "crm_created", "id": created.id})
+    outbox_worker.wake()
     return created
 
 @app.put("/crm/{entry_id}", response_model=CrmEntryOut)
-async def update_crm_entry(entry_id: str, entry: CrmEntryUpdate, db: Session = Depends(get_db)):
+def update_crm_entry(entry_id: str, entry: CrmEntryUpdate, db: Session = Depends(get_db)):
     updated = crud.update_crm_entry(db, entry_id, entry)
-    await broadcast_crm_update({"event": "crm_updated", "id": entry_id})
+    outbox_worker.wake()
     return updated
 
 @app.delete("/crm/{entry_id}", status_code=204)
-async def delete_crm_entry(entry_id: str, db: Session = Depends(get_db)):
+def delete_crm_entry(entry_id: str, db: Session = Depends(get_db)):
     if not crud.delete_crm_entry(db, entry_id):
         raise HTTPException(status_code=404, detail="CRM-Eintrag nicht gefunden")
+    outbox_worker.wake()
 
 @app.get("/status")
 def status_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profiles", include_in_schema=False)
+def list_profiles(current_user: User = Depends(get_current_user)):
+    return [p.summary() for p in reversed(profiling.profiles)]
+
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+def get_profile(profile_id: int, current_user: User = Depends(get_current_user)):
+    profile = profiling.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profil nicht gefunden")
+    return profile.to_dict()
@@ -0,0 +1,302 @@
+# metrics.py
+# Schlanke, abhängigkeitsfreie Metriken im Prometheus-Textformat (/metrics).
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_registry: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(val)}"' for name, val in zip(labelnames, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# =======================
+# 📊 Metrik-Typen
+# =======================
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, callback: Optional[Callable[[], Dict[Tuple, float]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+        # Optional: Werte erst beim Scrape berechnen (z.B. Pool-Status)
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = dict(self._values)
+        if self._callback is not None:
+            items.update(self._callback())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [Bucket-Zähler..., Summe, Anzahl]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += state[i]
+                le = ("le", _format_value(bound) if bound == float("inf") else repr(float(bound)))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# =======================
+# 🌐 HTTP
+# =======================
+HTTP_REQUESTS = Counter("http_requests_total", "Anzahl HTTP-Requests", ["method", "route", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Latenz je Route", ["method", "route"])
+
+# =======================
+# 🗄️ Datenbank
+# =======================
+DB_QUERIES = Counter("db_queries_total", "Ausgeführte SQL-Statements")
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL-Statements je Request", ["route"], buckets=COUNT_BUCKETS
+)
+DB_TIME_PER_REQUEST = Histogram("db_query_seconds_per_request", "SQL-Zeit je Request", ["route"])
+DB_POOL_CHECKOUT_WAIT = Histogram("db_pool_checkout_wait_seconds", "Wartezeit auf eine Pool-Verbindung")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Aktuell ausgeliehene Pool-Verbindungen", ["engine"])
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Checkouts, die am pool_timeout gescheitert sind")
+DB_READ_ROUTING = Counter("db_read_routing_total", "Lesende Sessions nach Ziel (Replica/Primary)", ["target"])
+
+_pools: Dict[str, object] = {}
+
+
+def register_pool(name: str, engine):
+    _pools[name] = engine.pool
+
+
+def _pool_status() -> Dict[Tuple, float]:
+    # Auslastung je Engine; StaticPool & Co. haben keine Größenangaben
+    values = {}
+    for name, pool in _pools.items():
+        if not hasattr(pool, "checkedout"):
+            continue
+        size = pool.size()
+        capacity = size + max(pool._max_overflow, 0)
+        values[(name, "size")] = size
+        values[(name, "capacity")] = capacity
+        values[(name, "checked_out")] = pool.checkedout()
+        values[(name, "checked_in")] = pool.checkedin()
+        values[(name, "overflow")] = max(pool.overflow(), 0)
+        values[(name, "saturation")] = pool.checkedout() / capacity if capacity else 0.0
+    return values
+
+
+DB_POOL_STATUS = Gauge("db_pool_status", "Pool-Größe und -Auslastung", ["engine", "state"], callback=_pool_status)
+
+ARCHIVED_ROWS = Counter("archived_rows_total", "In Archivtabellen verschobene Datensätze", ["kind"])
+
+# =======================
+# 🔄 WebSocket
+# =======================
+WS_CONNECTIONS = Gauge("websocket_connections", "Offene WebSocket-Verbindungen", ["endpoint"])
+WS_BROADCAST_LATENCY = Histogram("websocket_broadcast_duration_seconds", "Dauer eines Broadcasts", ["endpoint"])
+WS_DISCONNECTS = Counter("websocket_disconnects_total", "Geschlossene Verbindungen nach Grund", ["reason"])
+
+# =======================
+# 📤 Outbox
+# =======================
+OUTBOX_DISPATCHED = Counter("outbox_dispatched_total", "Ausgelieferte Outbox-Events", ["topic"])
+OUTBOX_FAILURES = Counter("outbox_failures_total", "Nach allen Versuchen verworfene Outbox-Events", ["topic"])
+OUTBOX_LAG = Histogram("outbox_lag_seconds", "Zeit vom Commit bis zur Auslieferung")
+
+# =======================
+# 🚦 Zulassungskontrolle
+# =======================
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Zugelassene, laufende Requests je Priorität", ["priority"])
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "Wartende Requests je Priorität", ["priority"])
+ADMISSION_QUEUE_WAIT = Histogram("admission_queue_wait_seconds", "Wartezeit in der Zulassungsqueue", ["priority"])
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Abgewiesene Requests (queue_full, timeout, rate_limited)", ["reason", "priority"])
+
+# =======================
+# 📧 E-Mail-Import
+# =======================
+EMAILS_INGESTED = Counter("email_ingested_total", "Importierte E-Mails", ["source"])
+EMAIL_INGEST_ERRORS = Counter("email_ingest_errors_total", "Fehler beim E-Mail-Import (imap, envelope, fetch, parse, db, worker, quarantine)",
+                              ["source", "stage"])
+EMAIL_INGEST_LATENCY = Histogram("email_ingest_duration_seconds", "Abruf- und Parse-Zeit je E-Mail", ["source"])
+EMAIL_INGEST_LAG = Histogram("email_ingest_lag_seconds", "Zeit vom Mail-Datum bis zum CRM-Eintrag", ["source"],
+                             buckets=(5, 15, 30, 60, 120, 300, 600, 1800, 3600, 21600, 86400))
+EMAIL_SOURCE_BACKLOG = Gauge("email_source_backlog", "Ungelesene passende Mails beim letzten Abruf", ["source"])
+EMAIL_POLL_DURATION = Histogram("email_poll_duration_seconds", "Dauer eines Abrufs je Postfach", ["source"])
+EMAIL_WRITE_BATCH = Histogram("email_write_batch_size", "CRM-Einträge je Bulk-Commit", buckets=COUNT_BUCKETS)
+
+
+# =======================
+# 🧮 Request-Kontext für SQL-Zählung
+# =======================
+class RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# Wird von der Middleware gesetzt; Starlette kopiert den Kontext in den Threadpool.
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def instrument_engine(engine, name: str = "primary"):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERIES.inc()
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+    @event.listens_for(engine.pool, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        DB_POOL_CHECKED_OUT.inc(engine=name)
+
+    @event.listens_for(engine.pool, "checkin")
+    def _checkin(dbapi_conn, record):
+        DB_POOL_CHECKED_OUT.dec(engine=name)
+
+
+# =======================
+# ⏱️ ASGI-Middleware
+# =======================
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_stats.reset(token)
+            elapsed = time.perf_counter() - start
+            # Routen-Template statt roher Pfad, damit IDs keine Label-Explosion erzeugen
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status_code))
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, route=route)
+            DB_TIME_PER_REQUEST.observe(stats.db_time, route=route)
@@ -0,0 +1,30 @@
+# migrate.py
+# Schema-Migrationen einmalig pro Deployment ausführen (vor dem Start der Worker)
+#   python migrate.py            # alle ausstehenden Migrationen anwenden
+#   python migrate.py --status   # aktuelle Version und ausstehende Migrationen anzeigen
+#   python migrate.py --to 3     # nur bis einschließlich Version 3
+import argparse
+import sys
+
+import migrations
+from database import dispose_engines, get_engine
+from logging_config import configure_logging
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Datenbank-Schema migrieren")
+    parser.add_argument("--status", action="store_true", help="Nur anzeigen, nichts ändern")
+    parser.add_argument("--to", type=int, dest="target", help="Zielversion (Standard: neueste)")
+    args = parser.parse_args()
+    configure_logging()
+
+    engine = get_engine()
+    try:
+        if args.status:
+            print(f"Aktuelle Version: {migrations.current_version(engine)}")
+            for module in migrations.pending(engine):
+                print(f"  ausstehend: {module.VERSION:04d} {module.DESCRIPTION}")
+            sys.exit(0)
+        applied = migrations.upgrade(engine, args.target)
+        print(f"{len(applied)} Migration(en) angewendet, Version {migrations.current_version(engine)}")
+    finally:
+        dispose_engines()
@@ -0,0 +1,93 @@
+# migrations/__init__.py
+# Versionierte Schema-Migrationen. Jede Datei vNNNN_name.py definiert VERSION, DESCRIPTION
+# und upgrade(conn); angewendete Versionen stehen in der Tabelle schema_version.
+# Ausführen: python migrate.py (einmal pro Deployment, nicht beim Start jedes Workers)
+# Migrationen definieren ihre Tabellen selbst (eigene MetaData) statt models.py zu importieren,
+# sonst legt eine alte Migration später ergänzte Spalten/Indizes schon mit an.
+import contextlib
+import datetime
+import importlib
+import logging
+import pkgutil
+from typing import List
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Gleichzeitige Deployments dürfen nicht parallel migrieren
+LOCK_NAME = "crm_schema_migrations"
+LOCK_TIMEOUT_SECONDS = 300
+
+
+def available() -> List:
+    modules = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith("v") and info.name[1:5].isdigit():
+            modules.append(importlib.import_module(f"{__name__}.{info.name}"))
+    modules.sort(key=lambda module: module.VERSION)
+    versions = [module.VERSION for module in modules]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Doppelte Migrationsversionen: {versions}")
+    return modules
+
+
+def applied_versions(conn) -> set:
+    schema_version.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def current_version(engine) -> int:
+    with engine.begin() as conn:
+        return max(applied_versions(conn), default=0)
+
+
+def pending(engine) -> List:
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    return [module for module in available() if module.VERSION not in done]
+
+
+@contextlib.contextmanager
+def _migration_lock(engine):
+    backend = engine.dialect.name
+    with engine.connect() as conn:
+        if backend == "mysql":
+            got = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"),
+                               {"name": LOCK_NAME, "timeout": LOCK_TIMEOUT_SECONDS}).scalar()
+            if got != 1:
+                raise RuntimeError("Migrations-Lock nicht erhalten (läuft bereits eine Migration?)")
+        elif backend == "postgresql":
+            conn.execute(text("SELECT pg_advisory_lock(hashtext(:name))"), {"name": LOCK_NAME})
+        try:
+            yield
+        finally:
+            if backend == "mysql":
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+            elif backend == "postgresql":
+                conn.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": LOCK_NAME})
+
+
+def upgrade(engine, target: int = None) -> List[int]:
+    applied = []
+    with _migration_lock(engine):
+        # Nach dem Lock neu lesen: ein anderer Prozess kann inzwischen migriert haben
+        for module in pending(engine):
+            if target is not None and module.VERSION > target:
+                break
+            started = datetime.datetime.utcnow()
+            with engine.begin() as conn:
+                module.upgrade(conn)
+                conn.execute(schema_version.insert().values(
+                    version=module.VERSION, description=module.DESCRIPTION, applied_at=started))
+            logger.info("Migration %04d angewendet: %s", module.VERSION, module.DESCRIPTION)
+            applied.append(module.VERSION)
+    return applied
@@ -0,0 +1,80 @@
+# Ausgangsschema (bisher per create_all beim Import angelegt); vorhandene Tabellen bleiben unverändert.
+# Tabellen hier eingefroren – spätere Änderungen an models.py gehören in eine eigene Migration.
+from sqlalchemy import JSON, Boolean, Column, Date, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+VERSION = 1
+DESCRIPTION = "Basisschema: users, labels, notes, note_label, crm_entries"
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(100), unique=True, index=True),
+    Column("hashed_password", String(200)),
+)
+
+Table(
+    "labels", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(50), unique=True),
+)
+
+Table(
+    "notes", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("first_name", String(100)),
+    Column("last_name", String(100)),
+    Column("email", String(100)),
+    Column("telephone", String(100)),
+    Column("address", String(200)),
+    Column("note_text", String(1000)),
+    Column("custom_date", Date, nullable=True),
+    Column("gender", String(10)),
+    Column("is_done", Boolean),
+    Column("created_at", DateTime),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("crm_entry_id", String(36), nullable=True),
+    Column("tracking_type", String(50), nullable=True),
+)
+
+Table(
+    "note_label", metadata,
+    Column("note_id", ForeignKey("notes.id"), primary_key=True),
+    Column("label_id", ForeignKey("labels.id"), primary_key=True),
+)
+
+Table(
+    "crm_entries", metadata,
+    Column("id", String(36), primary_key=True, index=True),
+    Column("anfrage_datum", DateTime),
+    Column("titel", String(255)),
+    Column("vorname", String(100)),
+    Column("nachname", String(100)),
+    Column("email", String(100), index=True),
+    Column("mobil", String(50)),
+    Column("festnetz", String(50)),
+    Column("krankheitsstatus", String(100)),
+    Column("todos", JSON, nullable=True),
+    Column("status", String(100)),
+    Column("bearbeiter", String(100)),
+    Column("wiedervorlage", DateTime, nullable=True),
+    Column("typ", String(50), nullable=True),
+    Column("stadium", String(100)),
+    Column("kontaktquelle", String(100)),
+    Column("erledigt", Boolean),
+    Column("infos", String(1000), nullable=True),
+    Column("nachricht", String(1000), nullable=True),
+    Column("informationsgebiet", String(255), nullable=True),
+    Column("einverstaendnis", String(255), nullable=True),
+    Column("betreff", String(255), nullable=True),
+    Column("strasse", String(255), nullable=True),
+    Column("hausnummer", String(20), nullable=True),
+    Column("plz", String(20), nullable=True),
+    Column("ort", String(100), nullable=True),
+    Column("land", String(100), nullable=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn)
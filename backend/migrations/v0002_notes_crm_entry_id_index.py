@@ -0,0 +1,14 @@
+# Index für die CRM-Verknüpfung der Notizen (Bestandsdatenbanken haben ihn noch nicht).
+# Manuell ohne migrate.py: v0002_notes_crm_entry_id_index.sql (MySQL, online)
+from sqlalchemy import Column, Index, MetaData, String, Table
+
+VERSION = 2
+DESCRIPTION = "Index ix_notes_crm_entry_id"
+
+# Nur die Spalte, die der Index braucht
+notes = Table("notes", MetaData(), Column("crm_entry_id", String(36)))
+ix_notes_crm_entry_id = Index("ix_notes_crm_entry_id", notes.c.crm_entry_id)
+
+
+def upgrade(conn):
+    ix_notes_crm_entry_id.create(conn, checkfirst=True)
@@ -0,0 +1,5 @@
+-- Index für notes.crm_entry_id (Tracking-Icons / ?include=notes) auf Bestandsdatenbanken.
+-- Gleiche DDL wie Migration v0002; für Deployments, die migrate.py noch nicht ausführen:
+--   mysql -h "$DB_HOST" -u "$DB_USER" -p "$DB_NAME" < migrations/v0002_notes_crm_entry_id_index.sql
+-- Läuft online (InnoDB, keine Schreibsperre). v0002 erkennt den vorhandenen Index und überspringt ihn.
+CREATE INDEX ix_notes_crm_entry_id ON notes (crm_entry_id) ALGORITHM=INPLACE LOCK=NONE;
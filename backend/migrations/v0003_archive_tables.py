@@ -0,0 +1,63 @@
+# Archivtabellen für erledigte, alte Notizen und CRM-Einträge (Spalten wie notes/crm_entries, Stand v0002)
+from sqlalchemy import JSON, Boolean, Column, Date, DateTime, Integer, MetaData, String, Table
+
+VERSION = 3
+DESCRIPTION = "Archivtabellen notes_archive, crm_entries_archive"
+
+metadata = MetaData()
+
+Table(
+    "notes_archive", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("first_name", String(100)),
+    Column("last_name", String(100)),
+    Column("email", String(100)),
+    Column("telephone", String(100)),
+    Column("address", String(200)),
+    Column("note_text", String(1000)),
+    Column("custom_date", Date, nullable=True),
+    Column("gender", String(10)),
+    Column("is_done", Boolean),
+    Column("created_at", DateTime),
+    Column("crm_entry_id", String(36), nullable=True, index=True),
+    Column("tracking_type", String(50), nullable=True),
+    Column("user_id", Integer, index=True),
+    Column("labels", JSON, nullable=True),
+    Column("archived_at", DateTime),
+)
+
+Table(
+    "crm_entries_archive", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("anfrage_datum", DateTime),
+    Column("titel", String(255)),
+    Column("vorname", String(100)),
+    Column("nachname", String(100)),
+    Column("email", String(100), index=True),
+    Column("mobil", String(50)),
+    Column("festnetz", String(50)),
+    Column("krankheitsstatus", String(100)),
+    Column("todos", JSON, nullable=True),
+    Column("status", String(100)),
+    Column("bearbeiter", String(100)),
+    Column("wiedervorlage", DateTime, nullable=True),
+    Column("typ", String(50), nullable=True),
+    Column("stadium", String(100)),
+    Column("kontaktquelle", String(100)),
+    Column("erledigt", Boolean),
+    Column("infos", String(1000), nullable=True),
+    Column("nachricht", String(1000), nullable=True),
+    Column("informationsgebiet", String(255), nullable=True),
+    Column("einverstaendnis", String(255), nullable=True),
+    Column("betreff", String(255), nullable=True),
+    Column("strasse", String(255), nullable=True),
+    Column("hausnummer", String(20), nullable=True),
+    Column("plz", String(20), nullable=True),
+    Column("ort", String(100), nullable=True),
+    Column("land", String(100), nullable=True),
+    Column("archived_at", DateTime),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn)
@@ -0,0 +1,21 @@
+# Outbox für Seiteneffekte nach dem Commit (WebSocket-Broadcasts)
+from sqlalchemy import JSON, Column, DateTime, Integer, MetaData, String, Table
+
+VERSION = 4
+DESCRIPTION = "Outbox-Tabelle outbox_events"
+
+metadata = MetaData()
+
+Table(
+    "outbox_events", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("topic", String(20)),
+    Column("event", String(50)),
+    Column("entity_id", String(36)),
+    Column("payload", JSON, nullable=True),
+    Column("created_at", DateTime, index=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn)
@@ -1,7 +1,7 @@
 # models.py
 
 from sqlalchemy import Column, Integer, String, Date, Boolean, Table, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, foreign
 from database import Base
 import datetime
 from sqlalchemy import JSON
@@ -27,10 +27,8 @@ note_label = Table(
     Column("label_id", ForeignKey("labels.id"), primary_key=True),
 )
 
-class Note(Base):
-    __tablename__ = "notes"
-
-    id = Column(Integer, primary_key=True, index=True)
+class NoteFields:
+    # Gemeinsame Spalten für Notizen und das Notiz-Archiv
     first_name = Column(String(100))
     last_name = Column(String(100))
     email = Column(String(100))
@@ -41,12 +39,25 @@ class Note(Base):
     gender = Column(String(10))
     is_done = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    crm_entry_id = Column(String(36), nullable=True, index=True)  # Verknüpfung zu CRM-Eintrag
+    tracking_type = Column(String(50), nullable=True)  # z.B. 'Kit', 'Abholung'
+
+class Note(NoteFields, Base):
+    __tablename__ = "notes"
+
+    id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))  # 🔐 Beziehung zu User
     owner = relationship("User", back_populates="notes")
 
     labels = relationship("Label", secondary=note_label, back_populates="notes")
-    crm_entry_id = Column(String(36), nullable=True)  # Verknüpfung zu CRM-Eintrag
-    tracking_type = Column(String(50), nullable=True)  # z.B. 'Kit', 'Abholung'
+
+    # Ohne echten Fremdschlüssel: Bestandsdaten können auf gelöschte CRM-Einträge zeigen
+    crm_entry = relationship(
+        "CrmEntry",
+        primaryjoin="foreign(Note.crm_entry_id) == CrmEntry.id",
+        back_populates="notes",
+        viewonly=True,
+    )
 
 class Label(Base):
     __tablename__ = "labels"
@@ -56,10 +67,8 @@ class Label(Base):
 
     notes = relationship("Note", secondary=note_label, back_populates="labels")
 
-class CrmEntry(Base):
-    __tablename__ = "crm_entries"
-
-    id = Column(String(36), primary_key=True, index=True)  # UUID Länge 36
+class CrmEntryFields:
+    # Gemeinsame Spalten für CRM-Einträge und das CRM-Archiv
     anfrage_datum = Column(DateTime)
     titel = Column(String(255))
     vorname = Column(String(100))
@@ -85,4 +94,56 @@ class CrmEntry(Base):
     hausnummer = Column(String(20), nullable=True)
     plz = Column(String(20), nullable=True)
     ort = Column(String(100), nullable=True)
-    land = Column(String(100), nullable=True)
\ No newline at end of file
+    land = Column(String(100), nullable=True)
+
+class CrmEntry(CrmEntryFields, Base):
+    __tablename__ = "crm_entries"
+
+    id = Column(String(36), primary_key=True, index=True)  # UUID Länge 36
+
+    # Tracking-Notizen (Kit, Abholung) zu diesem Eintrag
+    notes = relationship(
+        "Note",
+        primaryjoin="CrmEntry.id == foreign(Note.crm_entry_id)",
+        back_populates="crm_entry",
+        order_by="desc(Note.created_at)",
+        viewonly=True,
+    )
+
+# =======================
+# 🗄️ Archiv (erledigte, alte Datensätze)
+# =======================
+class ArchivedNote(NoteFields, Base):
+    __tablename__ = "notes_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # ursprüngliche Notiz-ID
+    user_id = Column(Integer, index=True)
+    labels = Column(JSON, nullable=True)  # Label-Namen zum Zeitpunkt der Archivierung
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class ArchivedCrmEntry(CrmEntryFields, Base):
+    __tablename__ = "crm_entries_archive"
+
+    id = Column(String(36), primary_key=True)  # ursprüngliche UUID
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    # Noch aktive Tracking-Notizen bleiben erreichbar
+    notes = relationship(
+        "Note",
+        primaryjoin="ArchivedCrmEntry.id == foreign(Note.crm_entry_id)",
+        order_by="desc(Note.created_at)",
+        viewonly=True,
+    )
+
+# =======================
+# 📤 Outbox (Seiteneffekte nach dem Commit)
+# =======================
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    topic = Column(String(20))  # 'notes' oder 'crm'
+    event = Column(String(50))  # z.B. 'note_created'
+    entity_id = Column(String(36))
+    payload = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
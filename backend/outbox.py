@@ -0,0 +1,160 @@
+# outbox.py
+# Transaktionaler Outbox: Seiteneffekte (WebSocket-Broadcasts usw.) werden in derselben
+# Transaktion wie die Änderung in outbox_events geschrieben und danach von einem
+# Hintergrund-Worker ausgeliefert – auch wenn der schreibende Prozess kurz nach dem Commit stirbt.
+#
+# Jeder App-Prozess liest den Outbox mit eigenem Cursor, weil jeder Prozess seine eigenen
+# WebSocket-Clients hat. Jedes Event wird pro Prozess genau einmal an die Handler gegeben;
+# alte Events räumt OUTBOX_RETENTION_SECONDS weg.
+import asyncio
+import datetime
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, or_
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from metrics import OUTBOX_DISPATCHED, OUTBOX_FAILURES, OUTBOX_LAG
+from models import OutboxEvent
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "0.5"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_BACKOFF = float(os.getenv("OUTBOX_RETRY_BACKOFF_SECONDS", "0.2"))
+OUTBOX_RETENTION_SECONDS = int(os.getenv("OUTBOX_RETENTION_SECONDS", "3600"))
+# Lücken in den IDs (noch nicht committete, parallele Transaktionen) so lange nachprüfen
+OUTBOX_GAP_TIMEOUT = float(os.getenv("OUTBOX_GAP_TIMEOUT_SECONDS", "10"))
+MAX_TRACKED_GAPS = 1000
+
+
+def enqueue(db: Session, topic: str, event: str, entity_id, payload: Optional[dict] = None):
+    # Kein Commit – das Event wird mit der eigentlichen Änderung zusammen committet
+    db.add(OutboxEvent(topic=topic, event=event, entity_id=str(entity_id), payload=payload))
+
+
+class OutboxWorker:
+    def __init__(self, handlers: Dict[str, Callable[[dict], Awaitable[None]]]):
+        self.handlers = handlers
+        self._cursor: Optional[int] = None  # erst im Worker gesetzt (DB beim Start evtl. nicht erreichbar)
+        self._gaps: Dict[int, float] = {}  # id -> Frist
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup = asyncio.Event()
+        self._last_purge = 0.0
+
+    # =======================
+    # ▶️ Lebenszyklus
+    # =======================
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def wake(self):
+        # Darf aus Threadpool-Handlern aufgerufen werden (nach dem Commit)
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # =======================
+    # 🔁 Abarbeiten
+    # =======================
+    async def _run(self):
+        while True:
+            try:
+                if self._cursor is None:
+                    # Nur Events ab Prozessstart ausliefern; schlägt das fehl, im nächsten Durchlauf erneut
+                    self._cursor = await asyncio.to_thread(self._max_id)
+                events = await asyncio.to_thread(self._fetch)
+                for event in events:
+                    await self._dispatch(event)
+                if time.monotonic() - self._last_purge > 60:
+                    await asyncio.to_thread(self._purge)
+                    self._last_purge = time.monotonic()
+                if len(events) >= OUTBOX_BATCH_SIZE:
+                    continue
+            except Exception:
+                logger.exception("Outbox-Abruf fehlgeschlagen")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _max_id(self) -> int:
+        with SessionLocal() as db:
+            return db.query(func.max(OutboxEvent.id)).scalar() or 0
+
+    def _fetch(self) -> list:
+        now = time.monotonic()
+        self._gaps = {gap: deadline for gap, deadline in self._gaps.items() if deadline > now}
+        with SessionLocal() as db:
+            query = db.query(OutboxEvent)
+            if self._gaps:
+                query = query.filter(or_(OutboxEvent.id > self._cursor, OutboxEvent.id.in_(list(self._gaps))))
+            else:
+                query = query.filter(OutboxEvent.id > self._cursor)
+            rows = query.order_by(OutboxEvent.id).limit(OUTBOX_BATCH_SIZE).all()
+            events = [
+                {"id": r.id, "topic": r.topic, "event": r.event, "entity_id": r.entity_id,
+                 "payload": r.payload, "created_at": r.created_at}
+                for r in rows
+            ]
+
+        for event in events:
+            event_id = event["id"]
+            if event_id in self._gaps:
+                del self._gaps[event_id]
+            elif event_id > self._cursor:
+                for missing in range(max(self._cursor + 1, event_id - MAX_TRACKED_GAPS), event_id):
+                    self._gaps[missing] = now + OUTBOX_GAP_TIMEOUT
+                self._cursor = event_id
+        return events
+
+    async def _dispatch(self, event: dict):
+        handler = self.handlers.get(event["topic"])
+        if handler is None:
+            return
+        message = {"event": event["event"], "id": _entity_id(event), "seq": event["id"]}
+        if event["payload"]:
+            message.update(event["payload"])
+
+        for attempt in range(OUTBOX_MAX_ATTEMPTS):
+            try:
+                await handler(message)
+                break
+            except Exception:
+                logger.warning("Outbox-Event %s fehlgeschlagen (Versuch %s)", event["id"], attempt + 1, exc_info=True)
+                await asyncio.sleep(OUTBOX_RETRY_BACKOFF * 2 ** attempt)
+        else:
+            OUTBOX_FAILURES.inc(topic=event["topic"])
+            logger.error("Outbox-Event %s nach %s Versuchen verworfen", event["id"], OUTBOX_MAX_ATTEMPTS)
+            return
+
+        OUTBOX_DISPATCHED.inc(topic=event["topic"])
+        if event["created_at"]:
+            OUTBOX_LAG.observe((datetime.datetime.utcnow() - event["created_at"]).total_seconds())
+
+    def _purge(self):
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=OUTBOX_RETENTION_SECONDS)
+        with SessionLocal() as db:
+            db.execute(delete(OutboxEvent).where(OutboxEvent.created_at < cutoff))
+            db.commit()
+
+
+def _entity_id(event: dict):
+    # Notiz-IDs sind Integer, CRM-IDs UUID-Strings – Format der bisherigen Broadcasts beibehalten
+    entity_id = event["entity_id"]
+    return int(entity_id) if event["topic"] == "notes" and entity_id.isdigit() else entity_id
@@ -0,0 +1,242 @@
+# profiling.py
+# Opt-in Profiling pro Request: SQL-Statements mit Laufzeit + gesampelter Python-Stack.
+# Aktivierung per Header "X-Profile: <PROFILE_TOKEN>" bzw. "X-Profile: 1" mit gültigem Bearer-Token,
+# oder zufällig mit PROFILE_SAMPLE_RATE (0.0–1.0).
+import functools
+import hmac
+import inspect
+import itertools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "x-profile").lower().encode()
+# Gemeinsames Geheimnis für den Header; leer = nur angemeldete Nutzer (Bearer-Token)
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "").encode()
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "100"))
+PROFILE_STACK_INTERVAL = float(os.getenv("PROFILE_STACK_INTERVAL_MS", "5")) / 1000
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+MAX_QUERIES_PER_PROFILE = 500
+MAX_STACK_DEPTH = 40
+
+
+class RequestProfile:
+    def __init__(self, profile_id: int, method: str, path: str):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.status = None
+        self.queries = []
+        self.dropped_queries = 0
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread_ids = set()
+        self._lock = threading.Lock()
+
+    def add_query(self, statement: str, duration_ms: float):
+        with self._lock:
+            if len(self.queries) < MAX_QUERIES_PER_PROFILE:
+                self.queries.append({"sql": statement, "ms": round(duration_ms, 3)})
+            else:
+                self.dropped_queries += 1
+
+    def add_thread(self, thread_id: int):
+        with self._lock:
+            self.thread_ids.add(thread_id)
+
+    def remove_thread(self, thread_id: int):
+        with self._lock:
+            self.thread_ids.discard(thread_id)
+
+    def summary(self) -> dict:
+        with self._lock:
+            query_count = len(self.queries) + self.dropped_queries
+            query_ms = sum(q["ms"] for q in self.queries)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "query_count": query_count,
+            "query_ms": round(query_ms, 3),
+        }
+
+    def to_dict(self) -> dict:
+        data = self.summary()
+        # Sampler kann nach dem Request noch ein Intervall lang schreiben – nur unter Lock lesen
+        with self._lock:
+            data["queries"] = list(self.queries)
+            data["dropped_queries"] = self.dropped_queries
+            data["stack_samples"] = self.samples
+            # "folded stacks" (root;…;leaf → Anzahl), direkt für Flamegraphs nutzbar
+            data["stacks"] = dict(self.stacks.most_common())
+        return data
+
+
+# Begrenzter Ringpuffer der letzten Profile
+profiles: deque = deque(maxlen=PROFILE_BUFFER_SIZE)
+_profile_ids = itertools.count(1)
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+def get_profile(profile_id: int) -> Optional[RequestProfile]:
+    for profile in list(profiles):
+        if profile.id == profile_id:
+            return profile
+    return None
+
+
+# =======================
+# 🐢 SQL-Hooks
+# =======================
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["profile_query_start"].pop()) * 1000
+        profile = current_profile.get()
+        if profile is not None:
+            profile.add_query(statement, elapsed_ms)
+        if elapsed_ms >= SLOW_QUERY_MS:
+            logger.warning("Langsame Query (%.1f ms): %s", elapsed_ms, statement,
+                           extra={"duration_ms": round(elapsed_ms, 1)})
+
+
+# =======================
+# 🔬 Stack-Sampler
+# =======================
+def _fold(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _StackSampler(threading.Thread):
+    def __init__(self, profile: RequestProfile):
+        super().__init__(name=f"profile-sampler-{profile.id}", daemon=True)
+        self.profile = profile
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(PROFILE_STACK_INTERVAL):
+            frames = sys._current_frames()
+            with self.profile._lock:
+                for thread_id in self.profile.thread_ids:
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self.profile.stacks[_fold(frame)] += 1
+                        self.profile.samples += 1
+
+    def stop(self):
+        # Nur signalisieren – kein join() auf dem Event-Loop; der Thread endet nach spätestens einem Intervall
+        self._stop_event.set()
+
+
+# =======================
+# 🧵 Sync-Handler im Threadpool
+# =======================
+def profile_thread(func):
+    # Threadpool-Thread nur für die Dauer des Handlers sampeln – danach bedient er fremde Requests
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        thread_id = threading.get_ident()
+        profile.add_thread(thread_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.remove_thread(thread_id)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    # Als app.router.route_class: umhüllt alle Sync-Endpunkte mit profile_thread
+    def __init__(self, path, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = profile_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+# =======================
+# ⏱️ ASGI-Middleware
+# =======================
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        headers = dict(scope.get("headers", []))
+        value = headers.get(PROFILE_HEADER)
+        if value not in (None, b"0", b"false", b""):
+            # Jeder Profil-Request startet einen Sampler-Thread – nicht für anonyme Clients
+            return self._authorized(value, headers.get(b"authorization", b""))
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    @staticmethod
+    def _authorized(value: bytes, authorization: bytes) -> bool:
+        if PROFILE_TOKEN and hmac.compare_digest(value, PROFILE_TOKEN):
+            return True
+        if authorization[:7].lower() == b"bearer ":
+            from auth import decode_token
+            payload = decode_token(authorization[7:].decode("latin-1"))
+            return bool(payload and payload.get("sub"))
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/debug/profiles") or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(next(_profile_ids), scope["method"], scope["path"])
+        # Event-Loop-Thread (async Handler) wird immer gesampelt;
+        # bei parallelen Requests enthalten seine Stacks auch fremde Arbeit.
+        profile.add_thread(threading.get_ident())
+        token = current_profile.set(profile)
+        sampler = _StackSampler(profile)
+        sampler.start()
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(profile.id).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.duration_ms = (time.perf_counter() - start) * 1000
+            current_profile.reset(token)
+            sampler.stop()
+            profiles.append(profile)
@@ -0,0 +1,213 @@
+# realtime.py
+# WebSocket-Verbindungen: Themen-Abos (notes, crm), Heartbeats, Idle-Timeout,
+# Limit pro Nutzer, Token-Ablauf und ein Speicherbudget pro Verbindung.
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from metrics import WS_BROADCAST_LATENCY, WS_CONNECTIONS, WS_DISCONNECTS
+import wire
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TOPICS = {"notes", "crm"}
+
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL_SECONDS", "25"))
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "75"))
+# Mindestens 1 – sonst würde jede neue Verbindung sofort wieder geschlossen
+WS_MAX_CONNECTIONS_PER_USER = max(1, int(os.getenv("WS_MAX_CONNECTIONS_PER_USER", "5")))
+WS_MAX_QUEUED_BYTES = int(os.getenv("WS_MAX_QUEUED_BYTES", str(256 * 1024)))
+
+CLOSE_IDLE = 4000
+CLOSE_SLOW_CONSUMER = 4001
+CLOSE_USER_LIMIT = 4002
+
+PING = {"event": "ping"}
+
+
+class Connection:
+    def __init__(self, websocket: WebSocket, username: str, topics: Set[str], expires_at: Optional[float],
+                 endpoint: str, heartbeat: bool, encoding: str = wire.JSON):
+        self.websocket = websocket
+        self.username = username
+        self.topics = topics
+        self.expires_at = expires_at
+        self.endpoint = endpoint
+        # Alte Clients (/ws/notes, /ws/crm) antworten evtl. nicht auf Pings –
+        # Idle-Timeout greift für sie erst, sobald sie einmal ein Pong geschickt haben.
+        self.heartbeat = heartbeat
+        # json (Text-Frames) oder msgpack (Binär-Frames)
+        self.encoding = encoding
+        self.connected_at = time.monotonic()
+        self.last_seen = self.connected_at
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.queued_bytes = 0
+        self.closed = False
+        self.sender: Optional[asyncio.Task] = None
+
+    def enqueue(self, payload) -> bool:
+        if self.queued_bytes + len(payload) > WS_MAX_QUEUED_BYTES:
+            return False
+        self.queued_bytes += len(payload)
+        self.queue.put_nowait(payload)
+        return True
+
+    async def _send_loop(self):
+        while True:
+            payload = await self.queue.get()
+            self.queued_bytes -= len(payload)
+            if isinstance(payload, bytes):
+                await self.websocket.send_bytes(payload)
+            else:
+                await self.websocket.send_text(payload)
+
+
+class ConnectionManager:
+    def __init__(self):
+        self.connections: Set[Connection] = set()
+        self.by_user: Dict[str, List[Connection]] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    # =======================
+    # 🔌 Auf- und Abbau
+    # =======================
+    async def connect(self, websocket: WebSocket, username: str, topics: Set[str], expires_at: Optional[float],
+                      endpoint: str, heartbeat: bool = True, encoding: str = wire.JSON) -> Connection:
+        # Limit pro Nutzer: älteste Verbindung weicht (meist ein halb offener Socket nach Netzwechsel)
+        existing = self.by_user.get(username, [])
+        while len(existing) >= WS_MAX_CONNECTIONS_PER_USER:
+            await self.close(existing[0], CLOSE_USER_LIMIT, "user_limit")
+
+        await websocket.accept()
+        conn = Connection(websocket, username, topics, expires_at, endpoint, heartbeat, encoding)
+        conn.sender = asyncio.create_task(self._run_sender(conn))
+        self.connections.add(conn)
+        self.by_user.setdefault(username, []).append(conn)
+        self._update_gauges()
+        return conn
+
+    async def _run_sender(self, conn: Connection):
+        try:
+            await conn._send_loop()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await self.close(conn, None, "send_failed")
+
+    async def close(self, conn: Connection, code: Optional[int], reason: str):
+        if conn.closed:
+            return
+        conn.closed = True
+        self.connections.discard(conn)
+        user_conns = self.by_user.get(conn.username)
+        if user_conns and conn in user_conns:
+            user_conns.remove(conn)
+            if not user_conns:
+                del self.by_user[conn.username]
+        if conn.sender and conn.sender is not asyncio.current_task():
+            conn.sender.cancel()
+        if code is not None:
+            try:
+                await conn.websocket.close(code=code)
+            except Exception:
+                pass
+        WS_DISCONNECTS.inc(reason=reason)
+        self._update_gauges()
+
+    def _update_gauges(self):
+        counts = {"notes": 0, "crm": 0, "multiplex": 0}
+        for conn in self.connections:
+            counts[conn.endpoint] = counts.get(conn.endpoint, 0) + 1
+        for endpoint, count in counts.items():
+            WS_CONNECTIONS.set(count, endpoint=endpoint)
+
+    # =======================
+    # 📥 Eingehende Nachrichten
+    # =======================
+    async def serve(self, conn: Connection):
+        try:
+            while not conn.closed:
+                message = await conn.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                conn.last_seen = time.monotonic()
+                raw = message.get("text")
+                self._handle_message(conn, raw if raw is not None else message.get("bytes") or b"")
+        except WebSocketDisconnect:
+            await self.close(conn, None, "client")
+        except Exception:
+            await self.close(conn, None, "receive_failed")
+
+    def _handle_message(self, conn: Connection, raw):
+        data = wire.decode_message(raw)
+        if not isinstance(data, dict):
+            return
+        event = data.get("event") or data.get("action")
+        if event == "pong":
+            conn.heartbeat = True
+        elif event in ("subscribe", "unsubscribe"):
+            topics = {t for t in data.get("topics", []) if t in TOPICS}
+            if event == "subscribe":
+                conn.topics |= topics
+            else:
+                conn.topics -= topics
+
+    # =======================
+    # 📤 Broadcast
+    # =======================
+    async def broadcast(self, topic: str, data: dict):
+        start = time.perf_counter()
+        # Einmal je Kodierung serialisieren, dann nur noch in die Queues der Verbindungen legen
+        message = {**data, "topic": topic}
+        encoded = {}
+        for conn in list(self.connections):
+            if topic not in conn.topics:
+                continue
+            if conn.encoding not in encoded:
+                encoded[conn.encoding] = wire.encode_message(message, conn.encoding)
+            if not conn.enqueue(encoded[conn.encoding]):
+                # Speicherbudget überschritten: Client liest nicht mehr mit
+                await self.close(conn, CLOSE_SLOW_CONSUMER, "slow_consumer")
+        WS_BROADCAST_LATENCY.observe(time.perf_counter() - start, endpoint=topic)
+
+    # =======================
+    # 💓 Heartbeat
+    # =======================
+    async def start(self):
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+        for conn in list(self.connections):
+            await self.close(conn, status.WS_1001_GOING_AWAY, "shutdown")
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(WS_PING_INTERVAL)
+            try:
+                await self.check_connections()
+            except Exception:
+                logger.exception("WebSocket-Heartbeat fehlgeschlagen")
+
+    async def check_connections(self):
+        now = time.monotonic()
+        wall_now = time.time()
+        for conn in list(self.connections):
+            if conn.expires_at is not None and conn.expires_at <= wall_now:
+                await self.close(conn, status.WS_1008_POLICY_VIOLATION, "token_expired")
+            elif conn.heartbeat and now - conn.last_seen > WS_IDLE_TIMEOUT:
+                await self.close(conn, CLOSE_IDLE, "idle")
+            elif not conn.enqueue(wire.encode_message(PING, conn.encoding)):
+                await self.close(conn, CLOSE_SLOW_CONSUMER, "slow_consumer")
+
+
+manager = ConnectionManager()
@@ -0,0 +1,6 @@
+from archive import run_archiver
+from logging_config import configure_logging
+
+if __name__ == "__main__":
+    configure_logging()
+    run_archiver()
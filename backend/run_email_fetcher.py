@@ -1,4 +1,45 @@
-from email_service import fetch_and_process_emails
+import argparse
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ingestion import IngestionManager, run_once
+from logging_config import configure_logging
+from metrics import render_metrics
+from settings import mail_sources_from_env
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
 
 if __name__ == "__main__":
-    fetch_and_process_emails()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="E-Mail-Import in das CRM")
+    parser.add_argument("--loop", action="store_true", help="Dauerhaft laufen (ein Worker je Postfach)")
+    parser.add_argument("--metrics-port", type=int, help="/metrics für den Import auf diesem Port anbieten")
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.metrics_port:
+        server = ThreadingHTTPServer(("0.0.0.0", args.metrics_port), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    if not args.loop:
+        run_once()
+    else:
+        manager = IngestionManager(mail_sources_from_env())
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+        signal.signal(signal.SIGINT, lambda *_: stopped.set())
+        manager.start()
+        stopped.wait()
+        manager.stop()
@@ -113,6 +113,9 @@ class CrmEntryOut(CrmEntryBase):
     class Config:
         orm_mode = True
 
+class CrmEntryWithNotes(CrmEntryOut):
+    notes: List[NoteOut] = []
+
 class CrmEntry(CrmEntryBase):
     id: int
     class Config:
@@ -0,0 +1,150 @@
+# settings.py
+# Datenbank- und Postfach-Einstellungen aus Umgebungsvariablen (.env), pro Deployment anpassbar.
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    url: str
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_timeout: int = 30
+    pool_recycle: int = 1800          # alle 30 Minuten recyceln
+    pool_pre_ping: bool = True
+    statement_timeout_ms: int = 0     # 0 = kein Limit
+    echo: bool = False
+
+    @property
+    def backend(self) -> str:
+        return self.url.split(":", 1)[0].split("+", 1)[0]
+
+    @property
+    def is_sqlite_memory(self) -> bool:
+        return self.backend == "sqlite" and (self.url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in self.url)
+
+    @classmethod
+    def from_env(cls, prefix: str = "DB_", url_var: str = "DATABASE_URL") -> "DatabaseSettings":
+        url = os.getenv(url_var)
+        if not url:
+            # Fehlende Teile (z.B. beim Replica nur REPLICA_DB_HOST) vom Primary übernehmen
+            user = os.getenv(f"{prefix}USER") or os.getenv("DB_USER")
+            password = os.getenv(f"{prefix}PASS") or os.getenv("DB_PASS")
+            host = os.getenv(f"{prefix}HOST")
+            port = os.getenv(f"{prefix}PORT") or os.getenv("DB_PORT") or "3306"
+            name = os.getenv(f"{prefix}NAME") or os.getenv("DB_NAME")
+            url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{name}"
+
+        pool_size = _env_int(f"{prefix}POOL_SIZE", cls.pool_size)
+        max_overflow = _env_int(f"{prefix}MAX_OVERFLOW", cls.max_overflow)
+
+        # Optional: Verbindungsbudget der DB auf die uvicorn-Worker aufteilen
+        budget = _env_int(f"{prefix}MAX_CONNECTIONS", None)
+        if budget:
+            workers = max(1, _env_int("WEB_CONCURRENCY", 1))
+            per_worker = max(1, budget // workers)
+            pool_size = max(1, per_worker // 3)
+            max_overflow = per_worker - pool_size
+
+        return cls(
+            url=url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=_env_int(f"{prefix}POOL_TIMEOUT", cls.pool_timeout),
+            pool_recycle=_env_int(f"{prefix}POOL_RECYCLE", cls.pool_recycle),
+            pool_pre_ping=_env_bool(f"{prefix}POOL_PRE_PING", cls.pool_pre_ping),
+            statement_timeout_ms=_env_int(f"{prefix}STATEMENT_TIMEOUT_MS", cls.statement_timeout_ms),
+            echo=_env_bool(f"{prefix}ECHO", _env_bool("SQL_LOG", cls.echo)),
+        )
+
+    @classmethod
+    def replica_from_env(cls) -> Optional["DatabaseSettings"]:
+        # Read-Replica ist optional: REPLICA_DATABASE_URL oder REPLICA_DB_HOST setzen
+        if not (os.getenv("REPLICA_DATABASE_URL") or os.getenv("REPLICA_DB_HOST")):
+            return None
+        return cls.from_env(prefix="REPLICA_DB_", url_var="REPLICA_DATABASE_URL")
+
+
+# Wie lange ein Nutzer nach einem Schreibzugriff vom Primary liest (Read-your-writes)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+
+@dataclass(frozen=True)
+class MailSource:
+    # Ein Postfach mit Absenderfilter, aus dem CRM-Einträge importiert werden
+    name: str
+    server: str
+    user: str
+    password: str
+    port: int = 993
+    mailbox: str = "INBOX"
+    senders: Tuple[str, ...] = ()
+    # Betreff-Teilstring (klein) → Kontaktquelle; wird vor den Standardregeln geprüft
+    kontaktquelle: Dict[str, str] = field(default_factory=dict)
+    default_kontaktquelle: str = ""
+    poll_interval: float = 60.0
+    # Ziel für Mails, die wiederholt nicht importiert werden konnten; leer = nur markieren
+    quarantine_mailbox: str = ""
+
+    def __post_init__(self):
+        # Ohne Absenderfilter würde jede ungelesene Mail importiert – nur mit ausdrücklichem "*"
+        if not self.senders:
+            raise ValueError(f"Postfach {self.name}: keine Absender konfiguriert (alle Absender: \"*\")")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MailSource":
+        # Passwort möglichst per Verweis auf eine Umgebungsvariable statt im JSON
+        password = data.get("password") or os.getenv(data.get("password_env", ""), "")
+        senders = data.get("senders", data.get("sender", ()))
+        return cls(
+            name=data["name"],
+            server=data["server"],
+            user=data["user"],
+            password=password,
+            port=int(data.get("port", cls.port)),
+            mailbox=data.get("mailbox", cls.mailbox),
+            senders=(senders,) if isinstance(senders, str) else tuple(senders),
+            kontaktquelle={k.lower(): v for k, v in data.get("kontaktquelle", {}).items()},
+            default_kontaktquelle=data.get("default_kontaktquelle", ""),
+            poll_interval=float(data.get("poll_interval", cls.poll_interval)),
+            quarantine_mailbox=data.get("quarantine_mailbox", ""),
+        )
+
+
+def mail_sources_from_env() -> List[MailSource]:
+    # EMAIL_SOURCES (JSON-Liste) oder EMAIL_SOURCES_FILE; sonst das alte Einzelpostfach
+    raw = os.getenv("EMAIL_SOURCES")
+    path = os.getenv("EMAIL_SOURCES_FILE")
+    if not raw and path:
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+    if raw:
+        return [MailSource.from_dict(item) for item in json.loads(raw)]
+    if not os.getenv("IMAP_SERVER"):
+        return []
+    sender = os.getenv("SENDER_FILTER")
+    return [MailSource(
+        name="default",
+        server=os.getenv("IMAP_SERVER"),
+        user=os.getenv("IMAP_USER"),
+        password=os.getenv("IMAP_PASS"),
+        senders=(sender,) if sender else (),
+        quarantine_mailbox=os.getenv("EMAIL_QUARANTINE_MAILBOX", ""),
+    )]
@@ -0,0 +1,40 @@
+# Backend-Module liegen flach in backend/ (import crud, import imap_fetch …)
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Nie gegen die Datenbank aus .env testen
+os.environ["DATABASE_URL"] = "sqlite://"
+
+
+@pytest.fixture
+def engine():
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    from sqlalchemy.orm import Session
+
+    import models
+
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def session_local(engine):
+    # SessionLocal (Outbox, Archiv-Lauf, Writer) an die Test-Engine binden
+    import database
+
+    database.SessionLocal.configure(bind=engine)
+    yield database.SessionLocal
+    database.SessionLocal.configure(bind=None)
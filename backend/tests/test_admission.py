@@ -0,0 +1,181 @@
+# Zulassungskontrolle: Prioritäten, Routen-Limits, volle Warteschlange/Timeout und Abbrüche
+import asyncio
+
+import pytest
+
+import admission
+from admission import BULK, READ, WRITE, AdmissionController, AdmissionMiddleware, RateLimiter
+
+
+def _controller(max_concurrency=1, reserved=0, route_limits=None, max_queue=10, queue_timeout=1.0):
+    return AdmissionController(max_concurrency, reserved, route_limits or {}, max_queue, queue_timeout)
+
+
+def test_waiters_admitted_by_priority():
+    async def scenario():
+        controller = _controller()
+        assert await controller.acquire(WRITE, "/notes/1") is None
+        order = []
+
+        async def request(priority, route):
+            assert await controller.acquire(priority, route) is None
+            order.append(priority)
+            await asyncio.sleep(0)
+            controller.release(priority, route)
+
+        # In umgekehrter Wichtigkeit eingereiht
+        tasks = [asyncio.create_task(request(p, r)) for p, r in
+                 ((BULK, "/crm/"), (READ, "/crm/1"), (WRITE, "/notes/"), (READ, "/notes/2"))]
+        await asyncio.sleep(0.01)
+        assert order == []
+        controller.release(WRITE, "/notes/1")
+        await asyncio.gather(*tasks)
+        assert order == [WRITE, READ, READ, BULK]
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_new_request_does_not_overtake_more_important_waiter():
+    async def scenario():
+        controller = _controller(max_concurrency=2, reserved=1)
+        assert await controller.acquire(READ, "/notes/1") is None
+        # Bulk darf den reservierten Platz nicht nehmen und wartet
+        bulk = asyncio.create_task(controller.acquire(BULK, "/crm/"))
+        await asyncio.sleep(0)
+        assert not bulk.done()
+        assert await controller.acquire(WRITE, "/notes/") is None
+        controller.release(WRITE, "/notes/")
+        controller.release(READ, "/notes/1")
+        assert await bulk is None
+
+    asyncio.run(scenario())
+
+
+def test_route_limit_only_applies_to_limited_routes():
+    async def scenario():
+        controller = _controller(max_concurrency=4, route_limits={"/crm/": 1})
+        assert await controller.acquire(BULK, "/crm/") is None
+        second = asyncio.create_task(controller.acquire(BULK, "/crm/"))
+        await asyncio.sleep(0)
+        assert not second.done()
+        # Andere Routen laufen weiter
+        assert await controller.acquire(READ, "/crm/abc") is None
+        controller.release(READ, "/crm/abc")
+        controller.release(BULK, "/crm/")
+        assert await second is None
+        controller.release(BULK, "/crm/")
+        assert controller.in_flight == 0
+        assert dict(controller.route_in_flight) == {"/crm/": 0}
+
+    asyncio.run(scenario())
+
+
+def test_queue_full_and_timeout():
+    async def scenario():
+        controller = _controller(max_queue=1, queue_timeout=0.05)
+        assert await controller.acquire(WRITE, "/notes/") is None
+        waiting = asyncio.create_task(controller.acquire(READ, "/notes/1"))
+        await asyncio.sleep(0)
+        assert await controller.acquire(READ, "/notes/2") == "queue_full"
+        assert await waiting == "timeout"
+        assert controller._waiters == []
+        controller.release(WRITE, "/notes/")
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancel_after_grant_returns_slot():
+    async def scenario():
+        controller = _controller()
+        assert await controller.acquire(WRITE, "/notes/") is None
+        waiter = asyncio.create_task(controller.acquire(READ, "/notes/1"))
+        await asyncio.sleep(0)
+        # Platz wird vergeben, der Client ist aber schon weg
+        controller.release(WRITE, "/notes/")
+        assert controller.in_flight == 1
+        waiter.cancel()
+        result = (await asyncio.gather(waiter, return_exceptions=True))[0]
+        if result is None:
+            # Python 3.11: wait_for liefert das schon gesetzte Ergebnis statt CancelledError –
+            # dann hält der Aufrufer den Platz und gibt ihn selbst zurück
+            assert controller.in_flight == 1
+            controller.release(READ, "/notes/1")
+        else:
+            assert isinstance(result, asyncio.CancelledError)
+        assert controller.in_flight == 0
+        assert controller._waiters == []
+
+    asyncio.run(scenario())
+
+
+def test_cancel_while_waiting_drops_waiter():
+    async def scenario():
+        controller = _controller()
+        assert await controller.acquire(WRITE, "/notes/") is None
+        waiter = asyncio.create_task(controller.acquire(READ, "/notes/1"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller._waiters == []
+        controller.release(WRITE, "/notes/")
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+# =======================
+# ASGI-Middleware
+# =======================
+async def _call(middleware, method="GET", path="/notes/1"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "query_string": b"",
+             "client": ("127.0.0.1", 1234)}
+    await middleware(scope, receive, send)
+    return sent[0]["status"], dict(sent[0].get("headers", []))
+
+
+async def _ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+@pytest.mark.parametrize("max_queue", [0, 10])
+def test_middleware_rejects_with_503_and_retry_after(monkeypatch, max_queue):
+    # max_queue=0: sofort queue_full; sonst Timeout in der Warteschlange
+    controller = _controller(max_queue=max_queue, queue_timeout=0.05)
+    monkeypatch.setattr(admission, "controller", controller)
+    monkeypatch.setattr(admission, "rate_limiter", RateLimiter(0, 0))
+
+    async def scenario():
+        assert await controller.acquire(WRITE, "/notes/") is None
+        status, headers = await _call(AdmissionMiddleware(_ok_app))
+        assert status == 503
+        assert headers[b"retry-after"] == str(admission.ADMISSION_RETRY_AFTER).encode()
+        controller.release(WRITE, "/notes/")
+        assert await _call(AdmissionMiddleware(_ok_app)) == (200, {})
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_middleware_rate_limit(monkeypatch):
+    monkeypatch.setattr(admission, "controller", _controller())
+    monkeypatch.setattr(admission, "rate_limiter", RateLimiter(60, 1))
+
+    async def scenario():
+        middleware = AdmissionMiddleware(_ok_app)
+        assert (await _call(middleware))[0] == 200
+        status, headers = await _call(middleware)
+        assert status == 429 and b"retry-after" in headers
+
+    asyncio.run(scenario())
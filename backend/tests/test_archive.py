@@ -0,0 +1,80 @@
+# Archivierung: Tracking-Notizen bleiben an ihren CRM-Einträgen hängen
+import datetime
+
+import archive
+import crud
+import models
+
+OLD = datetime.datetime(2020, 1, 1)
+
+
+def _note(note_id, crm_entry_id=None, tracking_type=None):
+    return models.Note(id=note_id, first_name="A", last_name="B", note_text="x", gender="w", is_done=True,
+                       created_at=OLD, crm_entry_id=crm_entry_id, tracking_type=tracking_type)
+
+
+def test_tracking_notes_of_existing_entries_stay_hot(db):
+    db.add_all([
+        models.CrmEntry(id="active", anfrage_datum=OLD, erledigt=False),
+        models.ArchivedCrmEntry(id="archived", anfrage_datum=OLD, erledigt=True),
+        _note(1, "active", "Kit"),
+        _note(2, "archived", "Abholung"),
+        _note(3, "deleted", "Kit"),
+        _note(4),
+    ])
+    db.commit()
+
+    moved = archive.archive_notes_batch(db, datetime.datetime.utcnow())
+
+    assert moved == 2
+    assert sorted(n.id for n in db.query(models.ArchivedNote)) == [3, 4]
+    db.expire_all()
+    active = crud.get_crm_entry_by_id(db, "active", include_notes=True)
+    assert [n.tracking_type for n in active.notes] == ["Kit"]
+    archived = crud.get_crm_entry_by_id(db, "archived", include_notes=True)
+    assert [n.tracking_type for n in archived.notes] == ["Abholung"]
+
+
+def test_tracking_notes_survive_full_archiver_run(db):
+    db.add_all([models.CrmEntry(id="e1", anfrage_datum=OLD, erledigt=True), _note(1, "e1", "Kit")])
+    db.commit()
+
+    archive.archive_notes_batch(db, datetime.datetime.utcnow())
+    archive.archive_crm_batch(db, datetime.datetime.utcnow())
+    archive.archive_notes_batch(db, datetime.datetime.utcnow())
+
+    db.expire_all()
+    entry = crud.get_crm_entry_by_id(db, "e1", include_notes=True)
+    assert isinstance(entry, models.ArchivedCrmEntry)
+    assert [n.tracking_type for n in entry.notes] == ["Kit"]
+
+
+def test_archived_notes_reachable_and_restored_on_edit(db):
+    import schemas
+
+    label = models.Label(name="Rückruf")
+    note = _note(5)
+    note.labels.append(label)
+    db.add(note)
+    db.commit()
+    archive.archive_notes_batch(db, datetime.datetime.utcnow())
+    assert db.query(models.Note).count() == 0
+
+    assert isinstance(crud.get_note_by_id(db, 5), models.ArchivedNote)
+    update = schemas.NoteUpdate(first_name="A", last_name="B", note_text="neu", gender="w",
+                                labels=["Rückruf"], is_done=False)
+    restored = crud.update_note(db, 5, update)
+    assert isinstance(restored, models.Note) and restored.id == 5
+    assert restored.note_text == "neu" and not restored.is_done
+    assert [l.name for l in restored.labels] == ["Rückruf"]
+    assert db.query(models.ArchivedNote).count() == 0
+
+
+def test_delete_archived_note(db):
+    db.add(_note(6))
+    db.commit()
+    archive.archive_notes_batch(db, datetime.datetime.utcnow())
+
+    assert crud.delete_note(db, 6)
+    assert crud.get_note_by_id(db, 6) is None
+    assert not crud.delete_note(db, 6)
@@ -0,0 +1,54 @@
+# Pool-Metriken aus den Pool-/Session-Events (QueuePool und StaticPool)
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+from database import create_engine_from_settings
+from metrics import DB_POOL_CHECKOUT_WAIT, DB_POOL_TIMEOUTS
+from settings import DatabaseSettings
+
+
+def _checkouts():
+    return DB_POOL_CHECKOUT_WAIT._values.get((), [0])[-1]
+
+
+def _timeouts():
+    return DB_POOL_TIMEOUTS._values.get((), 0)
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///{tmp}/pool.sqlite3"])
+def test_checkout_wait_observed(url, tmp_path):
+    engine = create_engine_from_settings(DatabaseSettings(url=url.format(tmp=tmp_path)), name="test")
+    before = _checkouts()
+    with Session(engine) as db:
+        db.execute(text("SELECT 1"))
+        db.commit()
+        db.execute(text("SELECT 1"))
+    assert _checkouts() == before + 2
+    engine.dispose()
+
+
+def test_pool_timeout_counted(tmp_path):
+    settings = DatabaseSettings(url=f"sqlite:///{tmp_path / 'pool.sqlite3'}", pool_size=1, max_overflow=0,
+                                pool_timeout=0.2)
+    engine = create_engine_from_settings(settings, name="test")
+    held = engine.connect()
+    before_timeouts, before_checkouts = _timeouts(), _checkouts()
+    try:
+        with Session(engine) as db, pytest.raises(PoolTimeoutError):
+            db.execute(text("SELECT 1"))
+    finally:
+        held.close()
+    assert _timeouts() == before_timeouts + 1
+    assert _checkouts() == before_checkouts + 1
+
+    # Verbindung wieder frei: normaler Checkout ohne Timeout, auch aus einem anderen Thread
+    thread = threading.Thread(target=lambda: Session(engine).execute(text("SELECT 1")))
+    thread.start()
+    thread.join()
+    assert _timeouts() == before_timeouts + 1
+    assert _checkouts() == before_checkouts + 2
+    engine.dispose()
@@ -0,0 +1,175 @@
+# Tests für den Teil-Abruf per IMAP mit aufgezeichneten FETCH-Antworten (Format wie von imaplib geliefert)
+import datetime
+
+import pytest
+
+import imap_fetch
+from imap_fetch import TextPart, decode_part, fetch_content, fetch_envelopes, find_text_parts, parse_fetch_response
+
+HEADER = b"Subject: =?utf-8?q?Anfrage_K=C3=B6ln?=\r\nFrom: Kontakt <kontakt@example.org>\r\nDate: Wed, 23 Jul 2025 17:00:00 +0200\r\n\r\n"
+
+# multipart/mixed: Text + PDF-Anhang + als Anhang markierte Textdatei (Dateiname als Literal)
+MIXED_WITH_ATTACHMENT = [
+    (b'12 (UID 4711 BODYSTRUCTURE (("text" "plain" ("charset" "utf-8") NIL NIL "7bit" 12 1 NIL NIL NIL NIL)'
+     b'("application" "pdf" ("name" "befund.pdf") NIL NIL "base64" 40960 NIL ("attachment" ("filename" "befund.pdf")) NIL NIL)'
+     b'("text" "plain" ("charset" "utf-8" "name" {7}', b"log.txt"),
+    (b') NIL NIL "7bit" 300 10 NIL ("attachment" ("filename" "log.txt")) NIL NIL) "mixed" ("boundary" "b1") NIL NIL NIL)'
+     b' BODY[HEADER.FIELDS (SUBJECT DATE FROM)] {%d}' % len(HEADER), HEADER),
+    b")",
+]
+
+# multipart/mixed → multipart/alternative (plain + html) + Bild
+NESTED_ALTERNATIVE = [
+    b'3 (UID 20 BODYSTRUCTURE ((("text" "plain" ("charset" "iso-8859-1") NIL NIL "quoted-printable" 120 4 NIL NIL NIL NIL)'
+    b'("text" "html" ("charset" "utf-8") NIL NIL "base64" 2048 30 NIL NIL NIL NIL) "alternative" ("boundary" "b2") NIL NIL NIL)'
+    b'("image" "png" ("name" "logo.png") "<logo@x>" NIL "base64" 5000 NIL ("inline" ("filename" "logo.png")) NIL NIL)'
+    b' "mixed" ("boundary" "b1") NIL NIL NIL))',
+]
+
+SINGLE_PART = [
+    b'5 (UID 30 BODYSTRUCTURE ("text" "html" ("charset" "iso-8859-1") NIL NIL "quoted-printable" 50 2 NIL NIL NIL NIL))',
+]
+
+
+class FakeIMAP:
+    # Liefert aufgezeichnete Antworten und merkt sich die angefragten Items
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def fetch(self, message_set, items):
+        self.requests.append((message_set, items))
+        return self.responses.pop(0)
+
+    def uid(self, command, message_set, items):
+        assert command == "FETCH"
+        return self.fetch(message_set, items)
+
+
+# =======================
+# 🧩 FETCH-Antwort
+# =======================
+def test_parse_fetch_response_with_literals():
+    messages = parse_fetch_response(MIXED_WITH_ATTACHMENT)
+    attributes = messages[12]
+    assert attributes["UID"] == "4711"
+    assert attributes["BODY[HEADER.FIELDS (SUBJECT DATE FROM)]"] == HEADER
+    # Literal mitten in der BODYSTRUCTURE landet an der richtigen Stelle
+    assert attributes["BODYSTRUCTURE"][2][2] == [b"charset", b"utf-8", b"name", b"log.txt"]
+
+
+def test_parse_fetch_response_normalizes_partial_and_case():
+    data = [
+        (b'7 (UID 99 body[1]<0> {4}', b"abcd"),
+        (b' BODY[HEADER.FIELDS ("Subject" "Date" "From")] {4}', b"x\r\n\r"),
+        b")",
+    ]
+    attributes = parse_fetch_response(data)[7]
+    assert attributes["BODY[1]"] == b"abcd"
+    assert 'BODY[HEADER.FIELDS ("SUBJECT" "DATE" "FROM")]' in attributes
+
+
+def test_parse_fetch_response_multiple_messages_and_nil():
+    data = [b'1 (UID 10 FLAGS (\\Seen) BODYSTRUCTURE ("text" "plain" NIL NIL NIL "7bit" 0 0 NIL NIL NIL NIL))',
+            b'2 (UID 11 FLAGS ())']
+    messages = parse_fetch_response(data)
+    assert messages[1]["FLAGS"] == ["\\Seen"]
+    assert messages[1]["BODYSTRUCTURE"][2] is None
+    assert messages[2] == {"UID": "11", "FLAGS": []}
+
+
+# =======================
+# 🌳 BODYSTRUCTURE
+# =======================
+def test_find_text_parts_skips_attachments():
+    structure = parse_fetch_response(MIXED_WITH_ATTACHMENT)[12]["BODYSTRUCTURE"]
+    assert find_text_parts(structure) == [TextPart("1", "plain", "utf-8", "7bit", 12)]
+
+
+def test_find_text_parts_nested_alternative():
+    structure = parse_fetch_response(NESTED_ALTERNATIVE)[3]["BODYSTRUCTURE"]
+    assert find_text_parts(structure) == [
+        TextPart("1.1", "plain", "iso-8859-1", "quoted-printable", 120),
+        TextPart("1.2", "html", "utf-8", "base64", 2048),
+    ]
+
+
+def test_find_text_parts_single_part():
+    structure = parse_fetch_response(SINGLE_PART)[5]["BODYSTRUCTURE"]
+    assert find_text_parts(structure) == [TextPart("1", "html", "iso-8859-1", "quoted-printable", 50)]
+
+
+def test_find_text_parts_ignores_garbage():
+    assert find_text_parts(None) == []
+    assert find_text_parts([]) == []
+
+
+# =======================
+# 🔤 Dekodieren
+# =======================
+def test_decode_part_iso_8859_1_quoted_printable():
+    raw = b"Gr=FC=DFe aus K=F6ln,=\r\n bitte um R=FCckruf.\r\n"
+    assert decode_part(raw, "quoted-printable", "iso-8859-1") == "Grüße aus Köln, bitte um Rückruf.\r\n"
+
+
+def test_decode_part_base64_across_chunks(monkeypatch):
+    # Kleine Blöcke: Mehrbyte-Zeichen werden über Blockgrenzen hinweg korrekt zusammengesetzt
+    monkeypatch.setattr(imap_fetch, "DECODE_CHUNK_BYTES", 8)
+    text = "Brustkrebs-Früherkennung – Testkit für Köln " * 20
+    import base64
+    raw = base64.encodebytes(text.encode("utf-8"))
+    assert decode_part(raw, "base64", "utf-8") == text
+
+
+def test_decode_part_truncated_base64():
+    # Partial Fetch schneidet mitten im Quad ab: vollständige Quads bleiben lesbar
+    assert decode_part(b"SGFsbG8gV2VsdA", "base64", "utf-8").startswith("Hallo W")
+
+
+def test_decode_part_unknown_charset_falls_back_to_utf8():
+    assert decode_part("Grüße".encode("utf-8"), "8bit", "x-unknown") == "Grüße"
+
+
+# =======================
+# 📬 Abruf
+# =======================
+def test_fetch_envelopes_by_uid():
+    imap = FakeIMAP([("OK", MIXED_WITH_ATTACHMENT)])
+    envelopes = fetch_envelopes(imap, [b"4711"], uid=True)
+    assert list(envelopes) == [4711]
+    assert imap.requests == [("4711", "(BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (SUBJECT DATE FROM)])")]
+
+
+def test_fetch_content_requests_only_text_parts():
+    envelope = parse_fetch_response(MIXED_WITH_ATTACHMENT)[12]
+    imap = FakeIMAP([("OK", [(b"12 (BODY[1] {12}", b"Hallo Welt\r\n"), b")"])])
+    mail = fetch_content(imap, 12, envelope)
+    assert imap.requests == [("12", "(BODY.PEEK[1])")]
+    assert mail.subject == "Anfrage Köln"
+    assert mail.sender == "Kontakt <kontakt@example.org>"
+    assert mail.anfrage_datum == datetime.datetime.fromtimestamp(1753282800)
+    assert mail.body == "Hallo Welt\r\n"
+    assert mail.html is None
+
+
+def test_fetch_content_partial_fetch(monkeypatch):
+    monkeypatch.setattr(imap_fetch, "MAX_TEXT_PART_BYTES", 1000)
+    envelope = parse_fetch_response(NESTED_ALTERNATIVE)[3]
+    imap = FakeIMAP([("OK", [
+        (b"3 (UID 20 BODY[1.1] {10}", b"K=F6ln=\r\nX"),
+        (b" BODY[1.2]<0> {14}", b"PGI+SGFsbG88L2"),
+        b")",
+    ])])
+    mail = fetch_content(imap, 20, envelope, uid=True)
+    # Nur der zu große HTML-Teil wird mit <0.N> angefragt
+    assert imap.requests == [("20", "(BODY.PEEK[1.1] BODY.PEEK[1.2]<0.1000>)")]
+    assert mail.body == "KölnX"
+    assert mail.html.startswith("<b>Hallo<")
+
+
+def test_fetch_content_raises_imap_error_on_no():
+    import imaplib
+    envelope = parse_fetch_response(SINGLE_PART)[5]
+    imap = FakeIMAP([("NO", [b"Message expunged"])])
+    with pytest.raises(imaplib.IMAP4.error):
+        fetch_content(imap, 5, envelope)
@@ -0,0 +1,107 @@
+# E-Mail-Worker gegen ein aufgezeichnetes Postfach (ohne Netzwerk und Datenbank)
+import threading
+from concurrent.futures import Future
+
+import ingestion
+from metrics import EMAIL_INGEST_ERRORS
+from settings import MailSource
+
+ENVELOPE = [
+    (b'1 (UID 7 BODYSTRUCTURE ("text" "plain" ("charset" "utf-8") NIL NIL "7bit" 31 1 NIL NIL NIL NIL)'
+     b' BODY[HEADER.FIELDS (SUBJECT DATE FROM)] {18}', b"Subject: Anfrage\r\n\r\n"),
+    b")",
+]
+BODY = [(b"1 (UID 7 BODY[1] {31}", b"Vorname: Anna\nNachname: Muster\n"), b")"]
+
+
+class FakeIMAP:
+    def __init__(self, envelope_response):
+        self.envelope_response = envelope_response
+        self.commands = []
+
+    def noop(self):
+        return "OK", [b""]
+
+    def logout(self):
+        pass
+
+    def uid(self, command, *args):
+        self.commands.append((command,) + args)
+        if command == "SEARCH":
+            return "OK", [b"7"]
+        if command == "FETCH":
+            return "OK", self.envelope_response if "BODYSTRUCTURE" in args[1] else BODY
+        return "OK", [b""]
+
+
+class FakeWriter:
+    def __init__(self):
+        self.records = []
+
+    def submit(self, records):
+        self.records.extend(records)
+        future = Future()
+        future.set_result([True] * len(records))
+        return future
+
+
+def _worker(imap, **source):
+    source = MailSource(name="test", server="imap.example.org", user="u", password="p",
+                        senders=("kontakt@example.org",), **source)
+    worker = ingestion.SourceWorker(source, FakeWriter(), threading.Event())
+    worker.imap = imap
+    return worker
+
+
+def _errors(stage):
+    return EMAIL_INGEST_ERRORS._values.get(EMAIL_INGEST_ERRORS._key({"source": "test", "stage": stage}), 0)
+
+
+def test_imports_and_marks_seen():
+    imap = FakeIMAP(ENVELOPE)
+    worker = _worker(imap)
+    assert worker.poll_safely()
+    assert [record["betreff"] for record in worker.writer.records] == ["Anfrage"]
+    assert ("STORE", "7", "+FLAGS", "\\Seen") in imap.commands
+
+
+def test_expunged_mail_is_skipped():
+    # Mail zwischen SEARCH und FETCH gelöscht: Server liefert keine FETCH-Daten
+    imap = FakeIMAP([None])
+    worker = _worker(imap)
+    before = _errors("envelope")
+    assert worker.poll_safely()
+    assert worker.writer.records == []
+    assert not [c for c in imap.commands if c[0] == "STORE"]
+    assert _errors("envelope") == before + 1
+    assert worker._attempts == {7: 1}
+
+
+def test_envelope_without_bodystructure_is_skipped():
+    imap = FakeIMAP([(b"1 (UID 7 BODY[HEADER.FIELDS (SUBJECT DATE FROM)] {18}", b"Subject: Anfrage\r\n\r\n"), b")"])
+    worker = _worker(imap)
+    assert worker.poll_safely()
+    assert worker.writer.records == []
+
+
+def test_sources_without_senders_are_rejected(monkeypatch):
+    import pytest
+    from settings import mail_sources_from_env
+
+    with pytest.raises(ValueError):
+        MailSource.from_dict({"name": "info", "server": "imap.example.org", "user": "u"})
+    monkeypatch.delenv("EMAIL_SOURCES", raising=False)
+    monkeypatch.delenv("EMAIL_SOURCES_FILE", raising=False)
+    monkeypatch.setenv("IMAP_SERVER", "imap.example.org")
+    monkeypatch.delenv("SENDER_FILTER", raising=False)
+    with pytest.raises(ValueError):
+        mail_sources_from_env()
+
+
+def test_search_criteria():
+    source = MailSource.from_dict({"name": "info", "server": "s", "user": "u",
+                                   "senders": ["a@example.org", "b@example.org", "c@example.org"]})
+    assert ingestion.search_criteria(source) == \
+        '(UNSEEN OR FROM "a@example.org" OR FROM "b@example.org" FROM "c@example.org")'
+    everything = MailSource.from_dict({"name": "info", "server": "s", "user": "u", "senders": "*"})
+    assert ingestion.search_criteria(everything) == "UNSEEN"
@@ -0,0 +1,43 @@
+# Migrationen gegen frische SQLite-Datenbanken: eingefrorene Schritte, Endstand wie models.py
+from sqlalchemy import create_engine, inspect
+
+import migrations
+import models
+
+
+def _schema(engine):
+    inspector = inspect(engine)
+    schema = {}
+    for table in inspector.get_table_names():
+        if table == "schema_version":
+            continue
+        schema[table] = {
+            "columns": {c["name"]: (str(c["type"]), c["nullable"]) for c in inspector.get_columns(table)},
+            "indexes": {(i["name"], tuple(i["column_names"]), bool(i["unique"])) for i in inspector.get_indexes(table)},
+            "foreign_keys": {(tuple(fk["constrained_columns"]), fk["referred_table"])
+                             for fk in inspector.get_foreign_keys(table)},
+        }
+    return schema
+
+
+def test_baseline_does_not_create_later_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    assert migrations.upgrade(engine, target=1) == [1]
+    indexes = {i["name"] for i in inspect(engine).get_indexes("notes")}
+    assert "ix_notes_crm_entry_id" not in indexes
+    assert "outbox_events" not in inspect(engine).get_table_names()
+
+    assert migrations.upgrade(engine) == [2, 3, 4]
+    assert "ix_notes_crm_entry_id" in {i["name"] for i in inspect(engine).get_indexes("notes")}
+    engine.dispose()
+
+
+def test_migrations_match_models(tmp_path):
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.sqlite3'}")
+    migrations.upgrade(migrated)
+    expected = create_engine(f"sqlite:///{tmp_path / 'models.sqlite3'}")
+    models.Base.metadata.create_all(expected)
+    # Neue Spalten/Tabellen in models.py brauchen eine neue Migration
+    assert _schema(migrated) == _schema(expected)
+    migrated.dispose()
+    expected.dispose()
@@ -0,0 +1,94 @@
+# Outbox-Worker: Lücken durch spät committete Transaktionen, Start ohne erreichbare DB
+import asyncio
+
+import models
+import outbox
+from outbox import OutboxWorker
+
+
+def _event(event_id, entity_id=None):
+    return models.OutboxEvent(id=event_id, topic="notes", event="note_created", entity_id=str(entity_id or event_id))
+
+
+def _ids(events):
+    return [event["id"] for event in events]
+
+
+def test_late_commit_below_cursor_delivered_once(db, session_local):
+    worker = OutboxWorker({})
+    worker._cursor = 0
+    db.add_all([_event(1), _event(3)])
+    db.commit()
+
+    # ID 2 gehört zu einer noch offenen Transaktion
+    assert _ids(worker._fetch()) == [1, 3]
+    assert worker._cursor == 3 and set(worker._gaps) == {2}
+    assert worker._fetch() == []
+
+    db.add(_event(2))
+    db.commit()
+    assert _ids(worker._fetch()) == [2]
+    assert worker._gaps == {}
+    assert worker._fetch() == []
+
+    db.add(_event(4))
+    db.commit()
+    assert _ids(worker._fetch()) == [4]
+
+
+def test_gaps_expire(db, session_local, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_GAP_TIMEOUT", 0)
+    worker = OutboxWorker({})
+    worker._cursor = 0
+    db.add_all([_event(1), _event(3)])
+    db.commit()
+    assert _ids(worker._fetch()) == [1, 3]
+
+    # Zu spät (z.B. zurückgerollt und ID nie vergeben): nicht mehr nachgeholt
+    db.add(_event(2))
+    db.commit()
+    assert worker._fetch() == []
+    assert worker._gaps == {}
+
+
+def test_tracked_gaps_are_bounded(db, session_local, monkeypatch):
+    monkeypatch.setattr(outbox, "MAX_TRACKED_GAPS", 5)
+    worker = OutboxWorker({})
+    worker._cursor = 0
+    db.add(_event(100))
+    db.commit()
+    assert _ids(worker._fetch()) == [100]
+    assert sorted(worker._gaps) == [95, 96, 97, 98, 99]
+
+
+def test_worker_starts_without_table_and_delivers_later(engine, session_local, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_POLL_INTERVAL", 0.01)
+    delivered = []
+
+    async def handler(message):
+        delivered.append(message)
+
+    async def scenario():
+        worker = OutboxWorker({"notes": handler})
+        # Noch keine Tabelle (migrate.py nicht gelaufen) – Start darf nicht scheitern
+        await worker.start()
+        await asyncio.sleep(0.05)
+        assert worker._cursor is None
+
+        models.Base.metadata.create_all(engine)
+        with session_local() as db:
+            db.add(_event(1))
+            db.commit()
+        await asyncio.sleep(0.05)
+        # Events vor dem ersten erfolgreichen Abruf gelten als alt
+        assert worker._cursor == 1 and delivered == []
+
+        with session_local() as db:
+            outbox.enqueue(db, "notes", "note_updated", 7)
+            db.commit()
+        worker.wake()
+        await asyncio.sleep(0.05)
+        await worker.stop()
+        assert delivered == [{"event": "note_updated", "id": 7, "seq": 2}]
+
+    asyncio.run(scenario())
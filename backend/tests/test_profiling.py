@@ -0,0 +1,64 @@
+# Profiling: Sync-Handler werden im Threadpool-Thread gesampelt, Profile sind während des Samplings lesbar
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiling
+
+
+def busy_handler_work():
+    deadline = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", b"geheim")
+    monkeypatch.setattr(profiling, "PROFILE_STACK_INTERVAL", 0.001)
+    app = FastAPI()
+    app.router.route_class = profiling.ProfiledRoute
+    app.add_middleware(profiling.ProfilingMiddleware)
+    threads = []
+
+    @app.get("/busy")
+    def busy(limit: int = 1):
+        threads.append(threading.get_ident())
+        busy_handler_work()
+        return {"limit": limit}
+
+    with TestClient(app) as test_client:
+        test_client.threads = threads
+        yield test_client
+
+
+def test_sync_handler_sampled_before_first_query(client):
+    response = client.get("/busy?limit=3", headers={"X-Profile": "geheim"})
+    assert response.json() == {"limit": 3}
+    profile = profiling.get_profile(int(response.headers["x-profile-id"]))
+    assert any("busy_handler_work" in stack for stack in profile.to_dict()["stacks"])
+    # Threadpool-Thread nach dem Handler wieder abgemeldet
+    assert client.threads[0] not in profile.thread_ids
+
+
+def test_unauthorized_header_is_ignored(client):
+    response = client.get("/busy", headers={"X-Profile": "1"})
+    assert "x-profile-id" not in response.headers
+
+
+def test_to_dict_while_sampler_runs():
+    profile = profiling.RequestProfile(0, "GET", "/")
+    profile.add_thread(threading.get_ident())
+    sampler = profiling._StackSampler(profile)
+    sampler.start()
+    try:
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            profile.to_dict()
+    finally:
+        sampler.stop()
+        sampler.join()
+    assert profile.to_dict()["stack_samples"] > 0
@@ -0,0 +1,51 @@
+# Content Negotiation für die kompakten Formate und die Kompression
+import pytest
+from starlette.requests import Request
+
+import wire
+
+
+def _request(accept=None, query=""):
+    headers = [(b"accept", accept.encode())] if accept is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/notes/", "query_string": query.encode(),
+                    "headers": headers})
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, wire.JSON),
+    ("*/*", wire.JSON),
+    ("application/json", wire.JSON),
+    ("application/msgpack", wire.MSGPACK),
+    ("application/x-msgpack;q=0.9, application/json;q=0.5", wire.MSGPACK),
+    ("application/json, application/msgpack;q=0", wire.JSON),
+    ("application/json, application/msgpack;q=0.5", wire.JSON),
+    ("application/json;q=0.5, application/vnd.crm.columnar+json", wire.COLUMNAR),
+    ("application/vnd.crm.columnar+json;q=0", wire.JSON),
+    ("application/json, application/vnd.crm.columnar+json", wire.COLUMNAR),
+    ("Application/MsgPack; charset=binary; q=1", wire.MSGPACK),
+    ("text/html, application/xml;q=0.9, */*;q=0.8", wire.JSON),
+])
+def test_negotiate_accept(monkeypatch, accept, expected):
+    monkeypatch.setattr(wire, "msgpack", object())
+    assert wire.negotiate(_request(accept)) == expected
+
+
+def test_negotiate_query_overrides_accept():
+    assert wire.negotiate(_request("application/msgpack", "format=columnar")) == wire.COLUMNAR
+
+
+def test_negotiate_without_msgpack(monkeypatch):
+    monkeypatch.setattr(wire, "msgpack", None)
+    assert wire.negotiate(_request("application/msgpack")) == wire.COLUMNAR
+
+
+@pytest.mark.parametrize("accept_encoding, brotli, expected", [
+    ("gzip, deflate, br", True, "br"),
+    ("gzip, br;q=0", True, "gzip"),
+    ("gzip;q=0, br", False, None),
+    ("*", False, "gzip"),
+    ("identity", False, None),
+])
+def test_accepted_encoding(monkeypatch, accept_encoding, brotli, expected):
+    monkeypatch.setattr(wire, "brotli", object() if brotli else None)
+    assert wire._accepted_encoding(accept_encoding) == expected
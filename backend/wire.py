@@ -0,0 +1,240 @@
+# wire.py
+# Kompakte Antwortformate für die großen Listen und Kompression (gzip/brotli).
+#
+# Formate (per Accept-Header oder ?format=…):
+#   json      – Standard, eine Zeile pro Objekt (unverändert)
+#   columnar  – application/vnd.crm.columnar+json: Feldnamen einmal, Werte spaltenweise
+#   msgpack   – application/msgpack: Spaltenlayout binär kodiert (nur mit installiertem msgpack)
+#
+# msgpack und brotli sind optional; ohne sie gibt es columnar bzw. gzip.
+import asyncio
+import functools
+import gzip
+import json
+import os
+from typing import Any, List, Optional, Sequence
+
+from dotenv import load_dotenv
+from pydantic import TypeAdapter
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+load_dotenv()
+
+JSON = "json"
+COLUMNAR = "columnar"
+MSGPACK = "msgpack"
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.crm.columnar+json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# Größere Bodies im Threadpool komprimieren, damit der Event-Loop frei bleibt
+COMPRESSION_THREAD_THRESHOLD = 256 * 1024
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/msgpack", "application/x-msgpack", "+json")
+
+
+# =======================
+# 🤝 Content Negotiation
+# =======================
+def _qualities(header: str) -> dict:
+    # "a;q=0.5, b" → {"a": 0.5, "b": 1.0}; für Accept und Accept-Encoding
+    accepted = {}
+    for part in header.split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = max(quality, accepted.get(name, 0.0))
+    return accepted
+
+
+def _media_quality(accepted: dict, media_type: str) -> float:
+    if media_type in accepted:
+        return accepted[media_type]
+    major = media_type.split("/", 1)[0]
+    return accepted.get(f"{major}/*", accepted.get("*/*", 0.0))
+
+
+def negotiate(request: Request) -> str:
+    requested = request.query_params.get("format")
+    if requested in (JSON, COLUMNAR, MSGPACK):
+        fmt = requested
+    else:
+        accepted = _qualities(request.headers.get("accept", ""))
+        # Kompakte Formate nur, wenn ausdrücklich genannt; bei gleicher Qualität vor JSON
+        candidates = [
+            (max(accepted.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES), 2, MSGPACK),
+            (accepted.get(COLUMNAR_MEDIA_TYPE, 0.0), 1, COLUMNAR),
+            (_media_quality(accepted, "application/json"), 0, JSON),
+        ]
+        quality, _, fmt = max(candidates)
+        if quality <= 0:
+            fmt = JSON
+    if fmt == MSGPACK and msgpack is None:
+        return COLUMNAR
+    return fmt
+
+
+@functools.lru_cache(maxsize=None)
+def _list_adapter(model) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def dump_rows(rows: Sequence[Any], model) -> List[dict]:
+    # ORM-Objekte einmal über das Schema validieren und JSON-kompatibel ausgeben
+    adapter = _list_adapter(model)
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+
+
+def to_columnar(rows: List[dict], fields: Sequence[str]) -> dict:
+    return {
+        "fields": list(fields),
+        "count": len(rows),
+        "columns": [[row[field] for row in rows] for field in fields],
+    }
+
+
+def encode(payload: dict, fmt: str) -> Response:
+    if fmt == MSGPACK:
+        body = msgpack.packb(payload, use_bin_type=True)
+        media_type = MSGPACK_MEDIA_TYPES[0]
+    else:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        media_type = COLUMNAR_MEDIA_TYPE
+    return Response(body, media_type=media_type, headers={"Vary": "Accept"})
+
+
+def compact_response(request: Request, rows: Sequence[Any], model) -> Optional[Response]:
+    # None = Client will normales JSON, dann antwortet der Endpunkt wie bisher
+    fmt = negotiate(request)
+    if fmt == JSON:
+        return None
+    return encode(to_columnar(dump_rows(rows, model), list(model.model_fields)), fmt)
+
+
+def compact_grouped_response(request: Request, groups: Sequence[Sequence[Any]], model) -> Optional[Response]:
+    # Alle Gruppen in einer Tabelle, "groups" enthält die Gruppengrößen in Reihenfolge
+    fmt = negotiate(request)
+    if fmt == JSON:
+        return None
+    flat = [row for group in groups for row in group]
+    payload = to_columnar(dump_rows(flat, model), list(model.model_fields))
+    payload["groups"] = [len(group) for group in groups]
+    return encode(payload, fmt)
+
+
+# =======================
+# 🔄 WebSocket-Nachrichten
+# =======================
+def websocket_encoding(requested: Optional[str]) -> str:
+    return MSGPACK if requested == MSGPACK and msgpack is not None else JSON
+
+
+def encode_message(data: dict, encoding: str):
+    # msgpack als Binär-Frame, sonst Text-Frame
+    if encoding == MSGPACK:
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data)
+
+
+def decode_message(raw) -> Any:
+    if isinstance(raw, bytes):
+        if msgpack is None:
+            return None
+        try:
+            return msgpack.unpackb(raw, raw=False)
+        except Exception:
+            return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return {"event": raw.strip()}
+
+
+# =======================
+# 🗜️ Kompression
+# =======================
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = _qualities(accept_encoding)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body_parts = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_parts)
+            headers = MutableHeaders(raw=start_message["headers"])
+            content_type = headers.get("content-type", "")
+            if (len(body) >= self.minimum_size and "content-encoding" not in headers
+                    and any(t in content_type for t in COMPRESSIBLE_TYPES)):
+                if len(body) >= COMPRESSION_THREAD_THRESHOLD:
+                    body = await asyncio.to_thread(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                headers["content-encoding"] = encoding
+                headers["content-length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            start_message = None
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -133,10 +133,35 @@ class ApiService {
   }
 
   // ======================== 🔄 WEBSOCKET ========================
+  // Ein gemeinsamer Socket für alle Seiten: /ws?topics=notes,crm.
+  // Jede Nachricht trägt "topic"; pro Topic gibt es einen Handler (die aktuelle Seite).
+  final Map<String, void Function(Map<String, dynamic> data)> _topicHandlers = {};
+  void Function(dynamic error)? _onWebSocketError;
+
+  void subscribe(
+    String topic,
+    void Function(Map<String, dynamic> data) onEvent, {
+    void Function(dynamic error)? onError,
+  }) {
+    _topicHandlers[topic] = onEvent;
+    if (onError != null) _onWebSocketError = onError;
+    _ensureWebSocket();
+  }
+
+  void unsubscribe(String topic) {
+    _topicHandlers.remove(topic);
+  }
+
+  // Notizen-Seiten: wie bisher, läuft jetzt über den gemeinsamen Socket
   void connectToWebSocket({
     required void Function(Map<String, dynamic> data) onEvent,
     void Function(dynamic error)? onError,
   }) {
+    subscribe('notes', onEvent, onError: onError);
+  }
+
+  void _ensureWebSocket() {
+    if (_channel != null) return; // Verhindere Mehrfachverbindungen
     if (_accessToken == null) {
       print("⚠️ Kein AccessToken vorhanden. WebSocket wird nicht verbunden.");
       return;
@@ -150,34 +175,43 @@ class ApiService {
       wsBaseUrl = baseUrl.replaceFirst('http', 'ws');
     }
 
-    final uri = Uri.parse('$wsBaseUrl/ws/notes?token=$_accessToken');
+    final uri = Uri.parse('$wsBaseUrl/ws?token=$_accessToken&topics=notes,crm');
     print("🔌 Verbinde WebSocket: $uri");
 
     try {
-      _channel = WebSocketChannel.connect(uri);
+      final channel = WebSocketChannel.connect(uri);
+      _channel = channel;
 
-      _channel!.stream.listen(
+      channel.stream.listen(
         (message) {
           try {
             final data = json.decode(message);
+            // Server-Heartbeat beantworten, sonst wird die Verbindung als tot geschlossen
+            if (data['event'] == 'ping') {
+              channel.sink.add(json.encode({'event': 'pong'}));
+              return;
+            }
             print("📥 WebSocket Nachricht: $data");
-            onEvent(data);
+            _topicHandlers[data['topic'] ?? 'notes']?.call(data);
           } catch (e) {
             print("❌ Fehler beim Parsen der WebSocket-Nachricht: $e");
           }
         },
         onError: (error) {
           print("❌ WebSocket Fehler: $error");
-          if (onError != null) onError(error);
+          _onWebSocketError?.call(error);
         },
         onDone: () {
           print("🔌 WebSocket Verbindung geschlossen.");
+          // Beim nächsten subscribe() neu verbinden
+          if (identical(_channel, channel)) _channel = null;
         },
         cancelOnError: true,
       );
     } catch (e) {
       print("❌ Fehler beim Aufbau der WebSocket-Verbindung: $e");
-      if (onError != null) onError(e);
+      _channel = null;
+      _onWebSocketError?.call(e);
     }
   }
 
@@ -234,6 +268,45 @@ class ApiService {
     }
   }
 
+  // CRM-Liste inkl. Tracking-Notizen je Eintrag in einem Request (für die Übersicht)
+  Future<(List<CrmEntry>, Map<String, List<Note>>)> fetchCrmEntriesWithNotes() async {
+    final response = await http.get(
+      Uri.parse('$baseUrl/crm/?include=notes'),
+      headers: _authHeaders,
+    );
+    if (response.statusCode == 200) {
+      final List<dynamic> jsonList = jsonDecode(response.body);
+      final entries = <CrmEntry>[];
+      final notesByEntry = <String, List<Note>>{};
+      for (final e in jsonList) {
+        final entry = CrmEntry.fromJson(e);
+        entries.add(entry);
+        final List notes = e['notes'] ?? [];
+        notesByEntry[entry.id] = notes.map((n) => Note.fromJson(n)).toList();
+      }
+      return (entries, notesByEntry);
+    } else {
+      throw Exception(
+        "CRM-Daten konnten nicht geladen werden: ${response.statusCode}",
+      );
+    }
+  }
+
+  // Tracking-Notizen (Kit, Abholung) eines CRM-Eintrags – zum Aktualisieren einer Zeile
+  Future<List<Note>> fetchNotesForCrmEntry(String crmEntryId) async {
+    final response = await http.get(
+      Uri.parse('$baseUrl/crm/$crmEntryId?include=notes'),
+      headers: _authHeaders,
+    );
+    if (response.statusCode == 200) {
+      final Map<String, dynamic> data = json.decode(response.body);
+      final List notes = data['notes'] ?? [];
+      return notes.map((e) => Note.fromJson(e)).toList();
+    } else {
+      throw Exception('Fehler beim Laden der Notizen (${response.statusCode})');
+    }
+  }
+
   Future<void> createCrmEntry(CrmEntry entry) async {
     final response = await http.post(
       Uri.parse('$baseUrl/crm/'),
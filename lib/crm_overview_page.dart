@@ -1,8 +1,5 @@
 import 'package:flutter/material.dart';
 import 'package:provider/provider.dart';
-import 'package:web_socket_channel/web_socket_channel.dart';
-import 'package:web_socket_channel/status.dart' as status;
-import 'dart:convert';
 
 import 'crm_entry.dart';
 import 'api_service.dart';
@@ -12,6 +9,8 @@ import 'note.dart';
 
 class CrmEntryProvider extends ChangeNotifier {
   List<CrmEntry> _entries = [];
+  // Tracking-Notizen je CRM-Eintrag, kommen mit der Liste (?include=notes)
+  Map<String, List<Note>> _trackingNotes = {};
   String _searchText = '';
   DateTimeRange? _selectedDateRange;
 
@@ -47,7 +46,9 @@ class CrmEntryProvider extends ChangeNotifier {
 
   Future<void> loadEntries(ApiService apiService) async {
     try {
-      _entries = await apiService.fetchCrmEntries();
+      final (entries, notes) = await apiService.fetchCrmEntriesWithNotes();
+      _entries = entries;
+      _trackingNotes = notes;
       _entries.sort((a, b) => (b.anfrageDatum ?? DateTime(1900)).compareTo(a.anfrageDatum ?? DateTime(1900)));
       sortColumnIndex = 0;
       sortAscending = false;
@@ -57,6 +58,23 @@ class CrmEntryProvider extends ChangeNotifier {
     }
   }
 
+  Note? trackingNote(String crmEntryId, String trackingType) {
+    for (final n in _trackingNotes[crmEntryId] ?? const <Note>[]) {
+      if (n.trackingType == trackingType) return n;
+    }
+    return null;
+  }
+
+  // Nach Bearbeiten einer Tracking-Notiz nur diese Zeile neu laden
+  Future<void> refreshTrackingNotes(ApiService apiService, String crmEntryId) async {
+    try {
+      _trackingNotes[crmEntryId] = await apiService.fetchNotesForCrmEntry(crmEntryId);
+      notifyListeners();
+    } catch (e) {
+      print("Fehler beim Laden der Tracking-Notizen: $e");
+    }
+  }
+
   void sortBy<T>(int columnIndex, Comparable<T> Function(CrmEntry e) getField, bool ascending) {
     sortColumnIndex = columnIndex;
     sortAscending = ascending;
@@ -109,7 +127,6 @@ class CRMOverviewPage extends StatefulWidget {
 }
 
 class _CRMOverviewPageState extends State<CRMOverviewPage> {
-  WebSocketChannel? _channel;
   DateTimeRange? _selectedDateRange;
 
   bool _initialized = false; // Damit loadEntries & WS nur einmal starten
@@ -127,43 +144,21 @@ class _CRMOverviewPageState extends State<CRMOverviewPage> {
   }
 
   void _connectToCrmWebSocket() {
-    if (_channel != null) return; // Verhindere Mehrfachverbindungen
-
-    final token = widget.apiService.accessToken;
-    if (token == null) {
-      print("❌ Kein Token für WebSocket");
-      return;
-    }
-
-    final uri = Uri.parse('ws://iqmedix.cloud:8000/ws/crm?token=$token');
-    _channel = WebSocketChannel.connect(uri);
-
-    _channel!.stream.listen(
-      (message) {
-        try {
-          final data = json.decode(message);
-          print("📥 CRM-Event: $data");
-          final event = data['event'];
-          if (event == 'crm_created' || event == 'crm_updated') {
-            final provider = Provider.of<CrmEntryProvider>(context, listen: false);
-            provider.loadEntries(widget.apiService);
-          }
-        } catch (e) {
-          print("❌ Fehler beim Parsen der CRM WebSocket Nachricht: $e");
-        }
-      },
-      onError: (error) {
-        print("❌ WebSocket Fehler: $error");
-      },
-      onDone: () {
-        print("🔌 WebSocket Verbindung geschlossen");
-      },
-    );
+    // Läuft über den gemeinsamen Socket der App (/ws?topics=notes,crm)
+    widget.apiService.subscribe('crm', (data) {
+      if (!mounted) return;
+      print("📥 CRM-Event: $data");
+      final event = data['event'];
+      if (event == 'crm_created' || event == 'crm_updated') {
+        final provider = Provider.of<CrmEntryProvider>(context, listen: false);
+        provider.loadEntries(widget.apiService);
+      }
+    });
   }
 
   @override
   void dispose() {
-    _channel?.sink.close(status.normalClosure);
+    widget.apiService.unsubscribe('crm');
     super.dispose();
   }
 
@@ -295,7 +290,7 @@ class CrmDataTableWrapper extends StatelessWidget {
                 sortColumnIndex: provider.sortColumnIndex,
                 sortAscending: provider.sortAscending,
                 columns: _buildColumns(provider),
-                source: CrmDataSource(filteredEntries, context),
+                source: CrmDataSource(filteredEntries, context, provider),
               ),
             ),
           ),
@@ -334,8 +329,9 @@ class CrmDataTableWrapper extends StatelessWidget {
 class CrmDataSource extends DataTableSource {
   final List<CrmEntry> entries;
   final BuildContext context;
+  final CrmEntryProvider provider;
 
-  CrmDataSource(this.entries, this.context);
+  CrmDataSource(this.entries, this.context, this.provider);
 
   void _deleteCrmEntry(BuildContext context, CrmEntry entry) async {
     final confirmed = await showDialog<bool>(
@@ -482,22 +478,22 @@ class CrmDataSource extends DataTableSource {
               _TrackingIcon(
                 crmEntryId: e.id,
                 trackingType: 'Kit',
+                note: provider.trackingNote(e.id, 'Kit'),
                 icon: Icons.inventory,
                 colorIfNone: Colors.grey,
                 colorIfOpen: Colors.amber,
                 colorIfDone: Colors.green,
-                context: context,
                 crmEntry: e,
               ),
               const SizedBox(width: 8),
               _TrackingIcon(
                 crmEntryId: e.id,
                 trackingType: 'Abholung',
+                note: provider.trackingNote(e.id, 'Abholung'),
                 icon: Icons.directions_car,
                 colorIfNone: Colors.grey,
                 colorIfOpen: Colors.amber,
                 colorIfDone: Colors.green,
-                context: context,
                 crmEntry: e,
               ),
             ],
@@ -587,105 +583,56 @@ class CrmDataSource extends DataTableSource {
 }
 }
 
-class _TrackingIcon extends StatefulWidget {
+class _TrackingIcon extends StatelessWidget {
   final String crmEntryId;
   final String trackingType;
+  final Note? note;
   final IconData icon;
   final Color colorIfNone;
   final Color colorIfOpen;
   final Color colorIfDone;
-  final BuildContext context;
   final CrmEntry crmEntry;
 
   const _TrackingIcon({
     required this.crmEntryId,
     required this.trackingType,
+    required this.note,
     required this.icon,
     required this.colorIfNone,
     required this.colorIfOpen,
     required this.colorIfDone,
-    required this.context,
     required this.crmEntry,
   });
 
-  @override
-  State<_TrackingIcon> createState() => _TrackingIconState();
-}
-
-class _TrackingIconState extends State<_TrackingIcon> {
-  Note? _note;
-  bool _loading = false;
-
-  @override
-  void initState() {
-    super.initState();
-    _fetchNote();
-  }
-
-  Future<void> _fetchNote() async {
-    setState(() => _loading = true);
-    try {
-      final notes = await ApiService().fetchNotes();
-      Note? note;
-      try {
-        note = notes.firstWhere(
-          (n) => n.crmEntryId == widget.crmEntryId && n.trackingType == widget.trackingType,
-        );
-      } catch (_) {
-        note = null;
-      }
-      setState(() => _note = note);
-    } catch (_) {
-      setState(() => _note = null);
-    } finally {
-      setState(() => _loading = false);
-    }
-  }
-
   Color get _iconColor {
-    if (_note == null) return widget.colorIfNone;
-    if (_note!.isDone) return widget.colorIfDone;
-    return widget.colorIfOpen;
+    if (note == null) return colorIfNone;
+    if (note!.isDone) return colorIfDone;
+    return colorIfOpen;
   }
 
-  void _onTap() async {
-    final note = _note;
-    Note? result;
-    if (note == null) {
-      // Neue Notiz anlegen
-      result = await Navigator.of(context).push<Note>(
-        MaterialPageRoute(
-          builder: (_) => FormPage(
-            fromCrmEntry: widget.crmEntry,
-            existingNote: null,
-            trackingType: widget.trackingType,
-          ),
-        ),
-      );
-    } else {
-      // Notiz bearbeiten
-      result = await Navigator.of(context).push<Note>(
-        MaterialPageRoute(
-          builder: (_) => FormPage(
-            fromCrmEntry: widget.crmEntry,
-            existingNote: note,
-            trackingType: widget.trackingType,
-          ),
+  void _onTap(BuildContext context) async {
+    // Neue Notiz anlegen (note == null) oder bestehende bearbeiten
+    await Navigator.of(context).push<Note>(
+      MaterialPageRoute(
+        builder: (_) => FormPage(
+          fromCrmEntry: crmEntry,
+          existingNote: note,
+          trackingType: trackingType,
         ),
-      );
-    }
-    // Nach Rückkehr immer neu laden, damit Status/Farbe stimmt
-    await _fetchNote();
+      ),
+    );
+    // Nach Rückkehr die Notizen dieses Eintrags neu laden, damit Status/Farbe stimmt
+    if (!context.mounted) return;
+    await Provider.of<CrmEntryProvider>(context, listen: false)
+        .refreshTrackingNotes(ApiService(), crmEntryId);
   }
 
   @override
   Widget build(BuildContext context) {
     return IconButton(
-      icon: _loading
-          ? const SizedBox(width: 24, height: 24, child: CircularProgressIndicator(strokeWidth: 2))
-          : Icon(widget.icon, color: _iconColor),
-      tooltip: widget.trackingType,
-      onPressed: _onTap,
+      icon: Icon(icon, color: _iconColor),
+      tooltip: trackingType,
+      onPressed: () => _onTap(context),
     );
   }
 }